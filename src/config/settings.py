@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'pages.middleware.SamplingProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -62,11 +66,25 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'pages.context_processors.admin_link',
             ],
         },
     },
 ]
 
+# Optional compiled engine for the large table-row partials (see pages/rows.py).
+# Used when Jinja2 is installed; otherwise the rows render with the Django engine.
+# It reads the same partials, which stick to syntax both engines accept.
+ROWS_TEMPLATE_ENGINE = None
+if importlib.util.find_spec('jinja2') is not None:
+    ROWS_TEMPLATE_ENGINE = 'jinja2'
+    TEMPLATES.append({
+        'NAME': ROWS_TEMPLATE_ENGINE,
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [BASE_DIR / 'pages' / 'templates'],
+        'APP_DIRS': False,
+    })
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
@@ -81,6 +99,24 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+# Cache invalidation webhook (POST /internal/invalidate/)
+# Requests must be signed with this secret; an empty secret disables the webhook.
+# Events go to a SQLite log shared by every worker process on the host.
+
+API_INVALIDATION_SECRET = os.environ.get('API_INVALIDATION_SECRET', '')
+API_INVALIDATION_LOG = Path(tempfile.gettempdir()) / 'video-rental-portal-invalidations.sqlite3'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -117,6 +153,20 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Sampling profiler (pages.middleware.SamplingProfilerMiddleware)
+# Profiles a fraction of requests per view; see `python manage.py profile_report`.
+# A sample rate of 0 removes the middleware entirely.
+
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_MODE = os.environ.get('PROFILER_MODE', 'deterministic')  # or 'statistical'
+PROFILER_URL_NAMES = []  # e.g. ['films', 'customers', 'rentals']; empty profiles every view
+PROFILER_OUTPUT_DIR = Path(tempfile.gettempdir()) / 'video-rental-portal-profiles'
+PROFILER_SAMPLING_INTERVAL = 0.005
+PROFILER_FLUSH_INTERVAL = 10
+
+# Worker boot budget checked by `python manage.py check_startup`
+STARTUP_BUDGET_MS = 500
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
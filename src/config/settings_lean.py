@@ -0,0 +1,40 @@
+"""
+Lean Django settings for portal workers.
+
+The portal only renders pages from the backend API, so this profile drops the
+admin, auth, sessions and messages apps and their middleware to cut worker
+boot time. Select it with DJANGO_SETTINGS_MODULE=config.settings_lean.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.staticfiles',
+    'pages'
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'pages.middleware.SamplingProfilerMiddleware',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'pages.context_processors.admin_link',
+            ],
+        },
+    },
+    # Keep the optional row engine configured in settings.py
+    *[engine for engine in TEMPLATES if ROWS_TEMPLATE_ENGINE and engine.get('NAME') == ROWS_TEMPLATE_ENGINE],
+]
+
+AUTH_PASSWORD_VALIDATORS = []
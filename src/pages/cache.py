@@ -0,0 +1,221 @@
+"""
+In-process caches for data fetched from the video rental backend.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class Dataset:
+    """
+    One version of a list fetched from the API (films, customers or rentals).
+
+    Anything expensive that is computed from the items (indexes, view-models, ...)
+    is stored with ``derive`` so it is built once per version and dropped with it.
+    """
+
+    def __init__(self, name: str, items: List[Dict[str, Any]], version: int, fetched_at: float = None):
+        self.name = name
+        self.items = items
+        self.version = version
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self._derived: Dict[str, Any] = {}
+        # Reentrant: builders may derive other values they depend on
+        self._lock = threading.RLock()
+
+    @property
+    def age(self) -> float:
+        """Seconds since the items were fetched."""
+        return time.time() - self.fetched_at
+
+    @property
+    def revision(self) -> int:
+        """
+        Hash of the items, the same in every worker process that holds the same list.
+
+        Unlike version, which counts this process's puts, it can be compared with
+        a value from a page another worker rendered.
+        """
+        return self.derive('revision', _content_revision)
+
+    def derive(self, key: str, builder: Callable[['Dataset'], Any]) -> Any:
+        """
+        Get a value derived from this dataset, building it on first use.
+
+        Args:
+            key: Name of the derived value
+            builder: Called with the dataset to build the value
+
+        Returns:
+            The cached or newly built value
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = builder(self)
+            return self._derived[key]
+
+
+def _content_revision(dataset: Dataset) -> int:
+    payload = json.dumps(dataset.items, sort_keys=True, separators=(',', ':'), default=str).encode()
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=6).digest(), 'big')
+
+
+class IdSet:
+    """
+    Compact membership set of non-negative integer IDs, one bit per ID.
+
+    IDs too sparse for a bitset to pay off are kept in a frozenset instead.
+    """
+
+    # Use a bitset while it needs at most this many bits per ID
+    MAX_BITS_PER_ID = 64
+
+    def __init__(self, ids: Iterable[int]):
+        ids = frozenset(ids)
+        if any(entity_id < 0 for entity_id in ids):
+            raise ValueError("IDs must be non-negative")
+
+        self.max_id = max(ids, default=-1)
+        self._count = len(ids)
+        self._bits: Optional[bytearray] = None
+        self._ids: Optional[frozenset] = None
+
+        if self.max_id < self.MAX_BITS_PER_ID * max(self._count, 1):
+            self._bits = bytearray(self.max_id // 8 + 1)
+            for entity_id in ids:
+                self._bits[entity_id >> 3] |= 1 << (entity_id & 7)
+        else:
+            self._ids = ids
+
+    def __contains__(self, entity_id: int) -> bool:
+        if not 0 <= entity_id <= self.max_id:
+            return False
+        if self._bits is None:
+            return entity_id in self._ids
+        return bool(self._bits[entity_id >> 3] & (1 << (entity_id & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def might_exist(self, entity_id: int) -> bool:
+        """
+        Whether an entity with this ID may exist.
+
+        IDs above the largest known one may belong to entities created after the
+        list was fetched, so only missing IDs up to it are ruled out.
+        """
+        return entity_id > self.max_id or entity_id in self
+
+
+class DatasetCache:
+    """
+    Thread-safe TTL cache of datasets, keyed by name.
+
+    Every ``put`` creates a new version, so derived data never outlives the items
+    it was built from.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._datasets: Dict[str, Dataset] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, max_age: float = None) -> Optional[Dataset]:
+        """
+        Get a dataset if it is cached and younger than the TTL (or max_age, if tighter).
+        """
+        dataset = self._datasets.get(name)
+        limit = self.ttl if max_age is None else min(self.ttl, max_age)
+        if dataset is None or dataset.age > limit:
+            return None
+        return dataset
+
+    def peek(self, name: str) -> Optional[Dataset]:
+        """
+        Get the latest dataset regardless of age (e.g. as a last-known-good copy).
+        """
+        return self._datasets.get(name)
+
+    def put(self, name: str, items: List[Dict[str, Any]], fetched_at: float = None) -> Dataset:
+        """
+        Store items as the next version of a dataset.
+
+        Args:
+            name: Dataset name
+            items: The full list
+            fetched_at: When the items were fetched, if not just now (e.g. a patched list)
+        """
+        with self._lock:
+            version = self._versions.get(name, 0) + 1
+            self._versions[name] = version
+            dataset = Dataset(name, items, version, fetched_at)
+            self._datasets[name] = dataset
+            return dataset
+
+    def invalidate(self, name: str = None):
+        """
+        Drop one dataset, or every dataset when no name is given.
+        """
+        with self._lock:
+            if name is None:
+                self._datasets.clear()
+            else:
+                self._datasets.pop(name, None)
+
+
+class EntityCache:
+    """
+    Thread-safe TTL cache of single entities (e.g. a film looked up by ID).
+
+    Keys are (entity_type, entity_id) tuples so one type can be dropped at once.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, Any], Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, Any]) -> Optional[Any]:
+        """Get a cached entity, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, key: Tuple[str, Any], value: Any):
+        """Cache an entity for the TTL."""
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+            if len(self._entries) >= self.max_entries:
+                # Still full: drop the entry closest to expiring
+                del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Tuple[str, Any]):
+        """Drop one entity."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_type(self, entity_type: str = None):
+        """Drop every entity of a type, or everything when no type is given."""
+        with self._lock:
+            if entity_type is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == entity_type]:
+                    del self._entries[key]
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._entries.items() if expires < now]:
+            del self._entries[key]
@@ -0,0 +1,12 @@
+"""
+Template context shared by every page.
+"""
+from django.apps import apps
+
+
+def admin_link(request):
+    """
+    Expose admin_installed so templates only link to /admin/ when it is mounted
+    (the lean settings profile leaves the admin out).
+    """
+    return {'admin_installed': apps.is_installed('django.contrib.admin')}
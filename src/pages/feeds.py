@@ -0,0 +1,143 @@
+"""
+Live rentals feed: one upstream poller per process, fanned out to Server-Sent Event clients.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+
+from .rows import build_rows, render_rows, rental_key, rental_row_key
+from .services import api_service
+
+logger = logging.getLogger(__name__)
+
+
+def diff_rentals(previous: Dict[Tuple, Dict], current: Dict[Tuple, Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Compare two polls keyed by rental_key.
+
+    Returns:
+        Tuple of (new_or_changed_rentals, removed_rentals)
+    """
+    changed = [rental for key, rental in current.items() if previous.get(key) != rental]
+    removed = [rental for key, rental in previous.items() if key not in current]
+    return changed, removed
+
+
+class RentalsFeed:
+    """
+    Polls /v1/rentals once per process and pushes diffs to every subscriber.
+
+    The poller starts with the first subscriber and stops after the last one
+    leaves, so idle workers make no upstream calls. Subscribers whose queue is
+    full (a stalled browser) are dropped instead of slowing everyone down.
+    """
+
+    POLL_INTERVAL = 5
+    QUEUE_SIZE = 50
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL, queue_size: int = QUEUE_SIZE):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot: Optional[Dict[Tuple, Dict]] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Register a client; must be called from the event loop serving it.
+
+        Returns:
+            Queue of ready-to-send SSE messages; None means the client was dropped
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+
+        if self._task is None or self._task.done():
+            self._snapshot = None
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Started rentals feed poller")
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a client, stopping the poller when nobody is left."""
+        self._subscribers.discard(queue)
+
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            logger.info("Stopped rentals feed poller")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def _run(self):
+        while True:
+            try:
+                message = await sync_to_async(self._poll, thread_sensitive=False)()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Rentals feed poll failed")
+                message = None
+
+            if message is not None:
+                self._broadcast(message)
+
+            await asyncio.sleep(self.poll_interval)
+
+    def _poll(self) -> Optional[str]:
+        """
+        Fetch rentals (shared with the page cache) and build the SSE message for changes.
+        """
+        if self._snapshot is None:
+            # Diff the first fetch against the copy the page was rendered from, so
+            # rentals created between the page load and this poll are pushed too
+            rendered = api_service.peek_dataset('rentals')
+            if rendered is not None:
+                self._snapshot = {rental_key(rental): rental for rental in rendered.items}
+
+        dataset, error_message = api_service.get_dataset('rentals', max_age=self.poll_interval)
+        if error_message:
+            logger.warning("Rentals feed could not poll the API: %s", error_message)
+            return None
+        if api_service.is_stale(dataset):
+            return None  # last-known-good copy during an outage: nothing new to report
+
+        current = {rental_key(rental): rental for rental in dataset.items}
+        previous, self._snapshot = self._snapshot, current
+        if previous is None:
+            return None  # nothing was cached to compare with: the first poll only sets the baseline
+
+        changed, removed = diff_rentals(previous, current)
+        if not changed and not removed:
+            return None
+
+        payload = {
+            'html': render_rows('rentals', build_rows('rentals', changed)),
+            'changed': len(changed),
+            'removed': len(removed),
+            # data-key values of rows to take out of the table
+            'removed_keys': [rental_row_key(rental) for rental in removed],
+            'total': len(dataset.items),
+        }
+        return f"event: rentals\ndata: {json.dumps(payload)}\n\n"
+
+    def _broadcast(self, message: str):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning("Dropping a slow rentals feed subscriber")
+                self._subscribers.discard(queue)
+                # Make room for the sentinel that tells the client stream to end
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+# Shared by every SSE connection served by this process
+rentals_feed = RentalsFeed()
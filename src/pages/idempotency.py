@@ -0,0 +1,106 @@
+"""
+Idempotency keys of write requests, recorded in a SQLite file shared by every worker on a host.
+
+The backend API does not deduplicate writes, so the portal does: a key is claimed
+before its request is sent, and whichever worker handles a resubmission sees
+that the key is in flight, already succeeded, or may have been applied.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    response TEXT
+);
+"""
+
+# States of a recorded key
+CLAIMED = 'claimed'      # returned by claim() to the caller that now owns the key
+IN_FLIGHT = 'in_flight'  # another caller is sending it
+DONE = 'done'            # the write succeeded; the response is stored
+UNCERTAIN = 'uncertain'  # the request may have reached the API, so it must not be resent
+
+
+class IdempotencyStore:
+    """
+    SQLite-backed record of idempotency keys; safe to use from many threads and processes.
+
+    Keys expire after ``ttl`` seconds, including keys left in flight by a worker
+    that died mid-request.
+    """
+
+    def __init__(self, path: str, ttl: float = 600):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            if not self._schema_ready:
+                connection.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.connection = connection
+        return connection
+
+    def claim(self, key: str) -> Tuple[str, Optional[Any]]:
+        """
+        Take ownership of a key before sending its request.
+
+        Returns:
+            Tuple of (state, response): CLAIMED if the caller now owns the key,
+            otherwise the key's recorded state and, for DONE, the stored response
+
+        Raises:
+            sqlite3.Error: The store is unusable; the request must not be sent
+        """
+        now = time.time()
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (now,))
+            row = connection.execute(
+                'SELECT state, response FROM idempotency_keys WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                connection.execute(
+                    'INSERT INTO idempotency_keys (key, state, expires_at) VALUES (?, ?, ?)',
+                    (key, IN_FLIGHT, now + self.ttl)
+                )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        if row is None:
+            return CLAIMED, None
+        return row[0], json.loads(row[1]) if row[1] is not None else None
+
+    def finish(self, key: str, state: str, response: Any = None):
+        """Record the outcome of a claimed key (DONE with its response, or UNCERTAIN)."""
+        try:
+            self._connect().execute(
+                'UPDATE idempotency_keys SET state = ?, expires_at = ?, response = ? WHERE key = ?',
+                (state, time.time() + self.ttl, json.dumps(response) if state == DONE else None, key)
+            )
+        except sqlite3.Error as e:
+            logger.error("Could not record idempotency key %s as %s: %s", key, state, e)
+
+    def release(self, key: str):
+        """Forget a claimed key whose request certainly created nothing, so it can be sent again."""
+        try:
+            self._connect().execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logger.error("Could not release idempotency key %s: %s", key, e)
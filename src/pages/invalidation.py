@@ -0,0 +1,222 @@
+"""
+Cache invalidation events pushed by the backend and shared between worker processes.
+
+The webhook publishes events to an append-only log in a SQLite file that every
+worker on the host can read (API_INVALIDATION_LOG). SQLite serializes writers and
+numbers each batch with AUTOINCREMENT, so concurrent publishers never share a
+sequence number. Each worker polls the log and applies new events to its own
+in-process caches.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Entity types the backend can report, and the list dataset each one lives in
+ENTITY_DATASETS = {
+    'film': 'films',
+    'customer': 'customers',
+    'rental': 'rentals',
+}
+
+# Seconds events stay in the log; workers that fall further behind drop everything
+EVENT_TTL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invalidation_events (
+    sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+    published_at REAL NOT NULL,
+    events TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    """This thread's connection to the log, created on first use."""
+    path = str(getattr(settings, 'API_INVALIDATION_LOG', None)
+               or os.path.join(tempfile.gettempdir(), 'video-rental-portal-invalidations.sqlite3'))
+    connection = getattr(_local, 'connection', None)
+    if connection is None or _local.path != path:
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        _local.connection, _local.path = connection, path
+    return connection
+
+
+def _latest_sequence(connection: sqlite3.Connection) -> int:
+    # AUTOINCREMENT keeps the highest number ever issued here, even once pruned
+    row = connection.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'invalidation_events'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def sign_payload(body: bytes, timestamp: str, secret: str) -> str:
+    """
+    Compute the signature the webhook expects in the X-Signature header.
+
+    Args:
+        body: Raw request body
+        timestamp: Value of the X-Timestamp header (Unix seconds)
+        secret: Shared secret (API_INVALIDATION_SECRET)
+
+    Returns:
+        "sha256=<hex digest>" of "<timestamp>.<body>"
+    """
+    message = timestamp.encode() + b'.' + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, timestamp: Optional[str], signature: Optional[str],
+                     secret: str, max_skew: float = 300) -> bool:
+    """
+    Check a webhook signature and reject stale timestamps (replays).
+    """
+    if not secret or not timestamp or not signature:
+        return False
+
+    try:
+        if abs(time.time() - float(timestamp)) > max_skew:
+            return False
+    except ValueError:
+        return False
+
+    return hmac.compare_digest(sign_payload(body, timestamp, secret), signature)
+
+
+def parse_events(payload: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Validate a webhook payload.
+
+    Expected shape: {"events": [{"type": "customer", "ids": [5, 7]}, {"type": "rental"}]}
+    where a missing or empty "ids" means every entity of that type changed.
+
+    Returns:
+        Normalized events, or None if the payload is invalid
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('events'), list):
+        return None
+
+    events = []
+    for event in payload['events']:
+        if not isinstance(event, dict) or event.get('type') not in ENTITY_DATASETS:
+            return None
+
+        ids = event.get('ids') or []
+        if not isinstance(ids, list):
+            return None
+        try:
+            ids = sorted({int(entity_id) for entity_id in ids})
+        except (TypeError, ValueError):
+            return None
+
+        events.append({'type': event['type'], 'ids': ids})
+
+    return events
+
+
+def publish(events: List[Dict[str, Any]]) -> int:
+    """
+    Append events to the shared log so every worker applies them.
+
+    Returns:
+        Sequence number of the published batch
+    """
+    now = time.time()
+    connection = _connect()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute('DELETE FROM invalidation_events WHERE published_at < ?', (now - EVENT_TTL,))
+        sequence = connection.execute(
+            'INSERT INTO invalidation_events (published_at, events) VALUES (?, ?)',
+            (now, json.dumps(events))
+        ).lastrowid
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+
+    logger.info("Published invalidation batch %d: %s", sequence, events)
+    return sequence
+
+
+class InvalidationFeed:
+    """
+    Reads new event batches from the shared log, at most once per poll interval.
+    """
+
+    # Returned by poll() when batches were missed: the caller must drop everything
+    EVERYTHING = [{'type': entity_type, 'ids': []} for entity_type in ENTITY_DATASETS]
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self._last_sequence: Optional[int] = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    def poll(self, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get the events published since the last poll, each with the published_at
+        timestamp of its batch (absent from EVERYTHING).
+
+        Args:
+            force: Poll even if the interval hasn't elapsed
+        """
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return []
+
+        if not self._lock.acquire(blocking=False):
+            return []  # another thread is polling right now
+
+        try:
+            self._next_poll = now + self.poll_interval
+            connection = _connect()
+            sequence = _latest_sequence(connection)
+
+            if self._last_sequence is None:
+                # First poll: our caches start empty, so earlier events don't matter
+                self._last_sequence = sequence
+                return []
+
+            if sequence < self._last_sequence:
+                logger.warning("Invalidation log was reset, dropping all cached data")
+                self._last_sequence = sequence
+                return self.EVERYTHING
+
+            rows = connection.execute(
+                'SELECT sequence, published_at, events FROM invalidation_events '
+                'WHERE sequence > ? AND sequence <= ? ORDER BY sequence',
+                (self._last_sequence, sequence)
+            ).fetchall()
+            if len(rows) != sequence - self._last_sequence:
+                # Batches expired before we read them: we can't tell what changed
+                logger.warning("Missed %d invalidation batches, dropping all cached data",
+                               sequence - self._last_sequence - len(rows))
+                self._last_sequence = sequence
+                return self.EVERYTHING
+
+            events = []
+            for _, published_at, batch_events in rows:
+                events.extend(dict(event, published_at=published_at) for event in json.loads(batch_events))
+
+            self._last_sequence = sequence
+            return events
+        except Exception:
+            logger.exception("Could not read the invalidation log")
+            return []
+        finally:
+            self._lock.release()
@@ -0,0 +1,254 @@
+"""
+Sorting, filtering and column selection for the films, customers and rentals listings.
+
+Sort orders and filter indexes are built once per dataset version with
+Dataset.derive, so a request only intersects and slices lists of positions.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from .cache import Dataset
+
+# Fields callers may request with ?fields= (JSON items, or table columns for the pages)
+DATASET_FIELDS = {
+    'films': ['title', 'description', 'release_year', 'language', 'rating'],
+    'customers': ['id', 'first_name', 'last_name', 'email'],
+    'rentals': ['first_name', 'last_name', 'phone', 'rental_date', 'title'],
+}
+
+# Columns of each listing table, in display order
+TABLE_COLUMNS = {
+    'films': [('title', 'Title'), ('description', 'Description'), ('release_year', 'Release Year'),
+              ('language', 'Language'), ('rating', 'Rating')],
+    'customers': [('id', 'ID'), ('first_name', 'First Name'), ('last_name', 'Last Name'),
+                  ('email', 'Email')],
+    'rentals': [('first_name', 'First Name'), ('last_name', 'Last Name'), ('phone', 'Phone'),
+                ('rental_date', 'Rental Date'), ('title', 'Title')],
+}
+
+# Fields each listing can be sorted by with ?sort=<field> or ?sort=-<field>.
+# Only fields the list endpoints send: the /v1/rentals Rental struct has no due
+# date or overdue flag (only CustomerRentals does, see docs/api-info.md).
+SORT_FIELDS = {
+    'films': ['title', 'release_year', 'language', 'rating'],
+    'customers': ['id', 'first_name', 'last_name', 'email'],
+    'rentals': ['rental_date', 'first_name', 'last_name', 'title'],
+}
+
+# Fields each listing can be filtered on with ?filter=<field>:<value>
+FILTER_FIELDS = {
+    'films': ['rating', 'language', 'release_year'],
+    'customers': [],
+    'rentals': [],
+}
+
+# Filters with few enough distinct values to offer as a dropdown
+MAX_FILTER_OPTIONS = 100
+
+
+def field_label(name: str, field: str) -> str:
+    """Column heading of a field, e.g. "Release Year"."""
+    return dict(TABLE_COLUMNS[name]).get(field) or field.replace('_', ' ').title()
+
+
+def filter_key(value: Any) -> str:
+    """Normalize a field value for filtering: case-insensitive, booleans as true/false."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).casefold()
+
+
+def _sort_key(value: Any) -> Tuple:
+    # Missing values last, numbers before strings, strings case-insensitively
+    if value is None or value == '':
+        return (1,)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, 0, value)
+    if isinstance(value, str):
+        return (0, 1, value.casefold())
+    return (0, 2, str(value))
+
+
+class FieldIndex:
+    """
+    Positions of a dataset's items grouped by the normalized value of one field.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], field: str):
+        self.positions: Dict[str, List[int]] = {}
+        self.labels: Dict[str, str] = {}
+
+        for position, item in enumerate(items):
+            value = item.get(field)
+            key = filter_key(value)
+            self.positions.setdefault(key, []).append(position)
+            self.labels.setdefault(key, key if isinstance(value, bool) else str(value))
+
+    def options(self) -> Optional[List[Tuple[str, str]]]:
+        """
+        (value, label) pairs for a filter dropdown, sorted by value, or None if
+        there are too many distinct values to list.
+        """
+        options = [(key, label) for key, label in self.labels.items() if key]
+        if len(options) > MAX_FILTER_OPTIONS:
+            return None
+        return sorted(options, key=lambda option: _sort_key(option[1]))
+
+
+def sort_order(dataset: Dataset, field: str, descending: bool = False) -> List[int]:
+    """
+    Item positions ordered by a field, built once per dataset version.
+
+    Items without a value come last in both directions.
+    """
+    def build(dataset):
+        keys = [_sort_key(item.get(field)) for item in dataset.items]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        if descending:
+            with_value = len(order) - sum(key[0] for key in keys)
+            order = order[with_value - 1::-1] + order[with_value:] if with_value else order
+        return order
+    return dataset.derive(f"sort:{'-' if descending else ''}{field}", build)
+
+
+def sort_rank(dataset: Dataset, field: str, descending: bool = False) -> List[int]:
+    """Rank of each item position in sort_order, for sorting small subsets."""
+    def build(dataset):
+        rank = [0] * len(dataset.items)
+        for ranked, position in enumerate(sort_order(dataset, field, descending)):
+            rank[position] = ranked
+        return rank
+    return dataset.derive(f"rank:{'-' if descending else ''}{field}", build)
+
+
+def field_index(dataset: Dataset, field: str) -> FieldIndex:
+    """Filter index of a field, built once per dataset version."""
+    return dataset.derive(f'index:{field}', lambda dataset: FieldIndex(dataset.items, field))
+
+
+class ListQuery:
+    """
+    Sort, filters and fields requested for a listing.
+    """
+
+    def __init__(self, name: str, sort: Optional[str] = None, descending: bool = False,
+                 filters: List[Tuple[str, str]] = None, fields: List[str] = None):
+        self.name = name
+        self.sort = sort
+        self.descending = descending
+        self.filters = filters or []
+        self.fields = fields or []
+
+    @classmethod
+    def from_params(cls, name: str, params) -> Tuple[Optional['ListQuery'], Optional[str]]:
+        """
+        Parse ?sort=, ?filter= and ?fields= (both repeatable) from a QueryDict.
+
+        Returns:
+            Tuple of (query, error_message)
+        """
+        sort = params.get('sort') or None
+        descending = False
+        if sort:
+            descending = sort.startswith('-')
+            sort = sort.lstrip('-')
+            if sort not in SORT_FIELDS[name]:
+                return None, f"Cannot sort {name} by {sort}; choose from {', '.join(SORT_FIELDS[name])}"
+
+        filters = []
+        for raw_filter in params.getlist('filter'):
+            if not raw_filter:
+                continue
+            field, separator, value = raw_filter.partition(':')
+            if not separator or field not in FILTER_FIELDS[name]:
+                allowed = ', '.join(FILTER_FIELDS[name]) or 'nothing'
+                return None, f"Invalid filter {raw_filter!r}; {name} can be filtered on {allowed} as field:value"
+            filters.append((field, filter_key(value)))
+
+        # "a,b" or, from the column checkboxes, one parameter per field
+        fields = [field for value in params.getlist('fields') for field in value.split(',') if field]
+        unknown_fields = [field for field in fields if field not in DATASET_FIELDS[name]]
+        if unknown_fields:
+            return None, f"Unknown fields: {', '.join(unknown_fields)}"
+
+        return cls(name, sort, descending, filters, fields), None
+
+    @property
+    def is_default(self) -> bool:
+        """Whether the table shows every row and column in the order the API returns them."""
+        return not (self.sort or self.filters) and self.columns() == TABLE_COLUMNS[self.name]
+
+    def positions(self, dataset: Dataset) -> Sequence[int]:
+        """
+        Positions of the matching items in the requested order.
+
+        Filters intersect their precomputed position lists; the result is then
+        ordered either by walking the precomputed sort order (large results) or
+        by sorting on precomputed ranks (small ones).
+        """
+        matches = None
+        found_lists = [field_index(dataset, field).positions.get(value, []) for field, value in self.filters]
+        for found in sorted(found_lists, key=len):
+            if matches is None:
+                matches = found
+            else:
+                found = set(found)
+                matches = [position for position in matches if position in found]
+
+        if self.sort is None:
+            return range(len(dataset.items)) if matches is None else matches
+        if matches is None:
+            return sort_order(dataset, self.sort, self.descending)
+        if len(matches) * 8 < len(dataset.items):
+            return sorted(matches, key=sort_rank(dataset, self.sort, self.descending).__getitem__)
+
+        matches = set(matches)
+        return [position for position in sort_order(dataset, self.sort, self.descending) if position in matches]
+
+    def columns(self) -> List[Tuple[str, str]]:
+        """Table columns to show: the requested fields, or all of them."""
+        columns = [column for column in TABLE_COLUMNS[self.name] if column[0] in self.fields]
+        return columns or TABLE_COLUMNS[self.name]
+
+    def query_string(self) -> str:
+        """The query as URL parameters, for the incremental loader and links."""
+        params = []
+        if self.sort:
+            params.append(('sort', f"-{self.sort}" if self.descending else self.sort))
+        params.extend(('filter', f"{field}:{value}") for field, value in self.filters)
+        if self.fields:
+            params.append(('fields', ','.join(self.fields)))
+        return urlencode(params)
+
+    def controls(self, dataset: Optional[Dataset]) -> Dict[str, Any]:
+        """
+        Options for the sort, filter and column controls above a listing.
+
+        Filter choices come from the dataset's filter indexes; fields with too
+        many distinct values get no dropdown.
+        """
+        sort_value = (f"-{self.sort}" if self.descending else self.sort) if self.sort else ''
+        sort_options = [('', 'Default order', not sort_value)]
+        for field in SORT_FIELDS[self.name]:
+            label = field_label(self.name, field)
+            sort_options.append((field, f"{label} ↑", sort_value == field))
+            sort_options.append((f"-{field}", f"{label} ↓", sort_value == f"-{field}"))
+
+        selected_filters = {f"{field}:{value}" for field, value in self.filters}
+        filters = []
+        for field in FILTER_FIELDS[self.name]:
+            options = field_index(dataset, field).options() if dataset is not None else None
+            if not options:
+                continue
+            filters.append({
+                'label': field_label(self.name, field),
+                'options': [(f"{field}:{value}", label, f"{field}:{value}" in selected_filters)
+                            for value, label in options],
+            })
+
+        shown = {field for field, _ in self.columns()}
+        columns = [(field, label, field in shown) for field, label in TABLE_COLUMNS[self.name]]
+
+        return {'sort_options': sort_options, 'filters': filters, 'columns': columns}
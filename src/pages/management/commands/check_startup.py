@@ -0,0 +1,98 @@
+"""
+Measure worker boot time and enforce the startup budget.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: boot the WSGI app and load the URLconf (and with
+# it every view module), the same work a worker does before serving a request.
+BOOT_SCRIPT = """
+import time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure how long a worker takes to boot and fail if it exceeds STARTUP_BUDGET_MS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            default=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            help="Settings module the measured workers boot with (e.g. config.settings_lean)."
+        )
+        parser.add_argument(
+            '--runs', type=int, default=5,
+            help="Number of cold boots to measure; the median is compared to the budget."
+        )
+        parser.add_argument(
+            '--budget-ms', type=float, default=None,
+            help="Override STARTUP_BUDGET_MS."
+        )
+        parser.add_argument(
+            '--top-imports', type=int, default=0,
+            help="Also list the N slowest imports of one boot (python -X importtime)."
+        )
+
+    def handle(self, *args, **options):
+        budget = options['budget_ms'] or getattr(settings, 'STARTUP_BUDGET_MS', 500)
+        profile = options['profile']
+
+        timings = [self._boot(profile) for _ in range(max(1, options['runs']))]
+        median = statistics.median(timings)
+
+        self.stdout.write(
+            f"Boot time with {profile}: median {median:.0f} ms "
+            f"(min {min(timings):.0f}, max {max(timings):.0f}, runs {len(timings)}), "
+            f"budget {budget:.0f} ms"
+        )
+
+        if options['top_imports']:
+            self._report_imports(profile, options['top_imports'])
+
+        if median > budget:
+            raise CommandError(f"Worker boot takes {median:.0f} ms, over the {budget:.0f} ms budget")
+
+        self.stdout.write(self.style.SUCCESS("Startup is within budget"))
+
+    def _run_boot(self, profile, *interpreter_flags):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        result = subprocess.run(
+            [sys.executable, *interpreter_flags, '-c', BOOT_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=False
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Worker boot failed with {profile}:\n{result.stderr}")
+        return result
+
+    def _boot(self, profile):
+        return float(self._run_boot(profile).stdout.strip().splitlines()[-1])
+
+    def _report_imports(self, profile, limit):
+        result = self._run_boot(profile, '-X', 'importtime')
+
+        # Lines look like: "import time:   self [us] | cumulative | imported package"
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            fields = line[len('import time:'):].split('|')
+            try:
+                self_us = int(fields[0])
+            except ValueError:
+                continue  # header line
+            imports.append((self_us, int(fields[1]), fields[2].strip()))
+
+        self.stdout.write(f"Slowest {limit} imports (self time):")
+        for self_us, cumulative_us, module in sorted(imports, reverse=True)[:limit]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:8.1f} ms)  {module}")
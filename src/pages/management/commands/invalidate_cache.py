@@ -0,0 +1,24 @@
+"""
+Publish cache invalidation events, standing in for the backend's webhook calls.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import invalidation
+
+
+class Command(BaseCommand):
+    help = "Tell every portal worker that films, customers or rentals changed upstream."
+
+    def add_arguments(self, parser):
+        parser.add_argument('type', choices=sorted(invalidation.ENTITY_DATASETS),
+                            help="Entity type that changed.")
+        parser.add_argument('ids', nargs='*', type=int,
+                            help="IDs that changed; omit to invalidate every entity of the type.")
+
+    def handle(self, *args, **options):
+        events = invalidation.parse_events({'events': [{'type': options['type'], 'ids': options['ids']}]})
+        if events is None:
+            raise CommandError("Invalid invalidation event")
+
+        sequence = invalidation.publish(events)
+        self.stdout.write(self.style.SUCCESS(f"Published invalidation batch {sequence}: {events}"))
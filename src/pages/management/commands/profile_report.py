@@ -0,0 +1,86 @@
+"""
+Print per-view hot-spot reports from the sampling profiler's output.
+"""
+import io
+import json
+import pstats
+import shutil
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.profiling import PSTATS_SUFFIX, SAMPLES_SUFFIX, safe_view_name
+
+
+class Command(BaseCommand):
+    help = "Merge the profiles of every worker and print the hot spots of each view."
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*',
+                            help="URL names to report on (default: every profiled view).")
+        parser.add_argument('--limit', type=int, default=20,
+                            help="Functions to list per view.")
+        parser.add_argument('--sort', choices=['cumulative', 'tottime', 'ncalls'], default='cumulative',
+                            help="Sort order for deterministic profiles.")
+        parser.add_argument('--reset', action='store_true',
+                            help="Delete the collected profiles after printing them.")
+
+    def handle(self, *args, **options):
+        output_dir = Path(settings.PROFILER_OUTPUT_DIR)
+        if not output_dir.is_dir():
+            raise CommandError(f"No profiles in {output_dir}; is PROFILER_SAMPLE_RATE above 0?")
+
+        if options['views']:
+            view_dirs = [output_dir / safe_view_name(view) for view in options['views']]
+        else:
+            view_dirs = sorted(path for path in output_dir.iterdir() if path.is_dir())
+
+        for view_dir in view_dirs:
+            if not view_dir.is_dir():
+                self.stderr.write(f"No profiles for view {view_dir.name}")
+                continue
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"=== {view_dir.name} ==="))
+            self._report_deterministic(view_dir, options['sort'], options['limit'])
+            self._report_statistical(view_dir, options['limit'])
+
+        if options['reset']:
+            shutil.rmtree(output_dir)
+            self.stdout.write(f"Deleted {output_dir}")
+
+    def _report_deterministic(self, view_dir, sort, limit):
+        files = sorted(str(path) for path in view_dir.glob(f'*{PSTATS_SUFFIX}'))
+        if not files:
+            return
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(*files, stream=buffer)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(f"Deterministic profile from {len(files)} worker(s):")
+        self.stdout.write(buffer.getvalue())
+
+    def _report_statistical(self, view_dir, limit):
+        files = sorted(view_dir.glob(f'*{SAMPLES_SUFFIX}'))
+        if not files:
+            return
+
+        requests = samples = 0
+        self_counts, total_counts = Counter(), Counter()
+        for path in files:
+            data = json.loads(path.read_text())
+            requests += data['requests']
+            samples += data['samples']
+            self_counts.update(data['self'])
+            total_counts.update(data['total'])
+
+        self.stdout.write(f"Statistical profile: {samples} samples over {requests} request(s)")
+        if not samples:
+            return
+
+        self.stdout.write("  self%   total%  function")
+        for label, count in self_counts.most_common(limit):
+            self.stdout.write(
+                f"  {count / samples * 100:5.1f}  {total_counts[label] / samples * 100:6.1f}   {label}"
+            )
@@ -0,0 +1,81 @@
+"""
+Middleware for the video rental portal.
+"""
+import cProfile
+import logging
+import random
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+from .profiling import DETERMINISTIC, STATISTICAL, StackSampler, get_aggregator
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profile a sample of requests and aggregate the results per view.
+
+    Settings:
+        PROFILER_SAMPLE_RATE: fraction of requests to profile; 0 removes the
+            middleware from the stack entirely, so it costs nothing when off
+        PROFILER_MODE: 'deterministic' (cProfile) or 'statistical' (stack sampling)
+        PROFILER_URL_NAMES: only profile these URL names, e.g. ['films', 'rentals']
+        PROFILER_OUTPUT_DIR: where per-view profiles are written
+        PROFILER_SAMPLING_INTERVAL: seconds between stack samples (statistical mode)
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed("Profiling is off (PROFILER_SAMPLE_RATE is 0)")
+
+        self.get_response = get_response
+        self.mode = getattr(settings, 'PROFILER_MODE', DETERMINISTIC)
+        if self.mode not in (DETERMINISTIC, STATISTICAL):
+            raise ValueError(f"PROFILER_MODE must be '{DETERMINISTIC}' or '{STATISTICAL}', not {self.mode!r}")
+
+        self.url_names = set(getattr(settings, 'PROFILER_URL_NAMES', []))
+        self.sampling_interval = getattr(settings, 'PROFILER_SAMPLING_INTERVAL', 0.005)
+        self.aggregator = get_aggregator(
+            settings.PROFILER_OUTPUT_DIR, getattr(settings, 'PROFILER_FLUSH_INTERVAL', 10)
+        )
+        logger.info("Profiling %.1f%% of requests (%s)", self.sample_rate * 100, self.mode)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+
+        view_name = match.url_name or match.view_name
+        if self.url_names and view_name not in self.url_names:
+            return self.get_response(request)
+
+        if self.mode == STATISTICAL:
+            sampler = StackSampler(threading.get_ident(), self.sampling_interval)
+            sampler.start()
+            try:
+                return self.get_response(request)
+            finally:
+                sampler.stop()
+                self.aggregator.add_samples(view_name, sampler)
+
+        profiler = cProfile.Profile()
+        try:
+            # Another profiler may already be active in this thread (e.g. a
+            # profiled test run); skip rather than fail the request
+            profiler.enable()
+        except ValueError:
+            return self.get_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            self.aggregator.add_profile(view_name, profiler)
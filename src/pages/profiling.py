@@ -0,0 +1,157 @@
+"""
+Per-view profile aggregation for the sampling profiler middleware.
+
+Deterministic samples (cProfile) are merged into one pstats file per view and
+process; statistical samples (periodic stack snapshots) into one JSON file of
+function hit counts per view and process. `manage.py profile_report` merges the
+files of every process into hot-spot reports.
+"""
+import atexit
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DETERMINISTIC = 'deterministic'
+STATISTICAL = 'statistical'
+
+PSTATS_SUFFIX = '.prof'
+SAMPLES_SUFFIX = '.samples.json'
+
+
+def frame_label(code) -> str:
+    """Label a code object the way pstats prints functions: file:line(function)."""
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+def safe_view_name(view_name: str) -> str:
+    """Make a view name usable as a directory name."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', view_name) or 'unnamed'
+
+
+class StackSampler:
+    """
+    Samples one thread's call stack at a fixed interval from a background thread.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self._stop.is_set():
+                continue  # the thread is already in stop(), waiting for us
+
+            self.samples += 1
+            self.self_counts[frame_label(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                label = frame_label(frame.f_code)
+                if label not in seen:  # count recursive functions once per sample
+                    seen.add(label)
+                    self.total_counts[label] += 1
+                frame = frame.f_back
+
+
+class ProfileAggregator:
+    """
+    Accumulates profiles per view in this process and flushes them to disk.
+    """
+
+    def __init__(self, output_dir: Path, flush_interval: float = 10):
+        self.output_dir = Path(output_dir)
+        self.flush_interval = flush_interval
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._samples: Dict[str, Dict] = {}
+        self._dirty = set()
+        self._next_flush = time.monotonic() + flush_interval
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def add_profile(self, view_name: str, profiler: cProfile.Profile):
+        """Merge one deterministic profile into the view's totals."""
+        with self._lock:
+            stats = self._stats.get(view_name)
+            if stats is None:
+                self._stats[view_name] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+            self._dirty.add(view_name)
+        self._maybe_flush()
+
+    def add_samples(self, view_name: str, sampler: StackSampler):
+        """Merge one request's stack samples into the view's totals."""
+        with self._lock:
+            totals = self._samples.setdefault(
+                view_name, {'requests': 0, 'samples': 0, 'self': Counter(), 'total': Counter()}
+            )
+            totals['requests'] += 1
+            totals['samples'] += sampler.samples
+            totals['self'].update(sampler.self_counts)
+            totals['total'].update(sampler.total_counts)
+            self._dirty.add(view_name)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Write every view with new data to <output_dir>/<view>/<pid>.*"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._next_flush = time.monotonic() + self.flush_interval
+
+            for view_name in dirty:
+                view_dir = self.output_dir / safe_view_name(view_name)
+                try:
+                    view_dir.mkdir(parents=True, exist_ok=True)
+                    if view_name in self._stats:
+                        self._stats[view_name].dump_stats(view_dir / f"{os.getpid()}{PSTATS_SUFFIX}")
+                    if view_name in self._samples:
+                        totals = self._samples[view_name]
+                        (view_dir / f"{os.getpid()}{SAMPLES_SUFFIX}").write_text(json.dumps({
+                            'requests': totals['requests'],
+                            'samples': totals['samples'],
+                            'self': dict(totals['self']),
+                            'total': dict(totals['total']),
+                        }))
+                except OSError as e:
+                    logger.error("Could not write profile for %s: %s", view_name, e)
+
+
+_aggregator: Optional[ProfileAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator(output_dir: Path, flush_interval: float) -> ProfileAggregator:
+    """Process-wide aggregator, created on first use."""
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = ProfileAggregator(output_dir, flush_interval)
+        return _aggregator
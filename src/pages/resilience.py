@@ -0,0 +1,356 @@
+"""
+Resilience primitives used by the API service to protect the video rental backend.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_group(endpoint: str) -> str:
+    """
+    Map an API endpoint path to the group used for limits and metrics.
+
+    Examples:
+    - "/v1/films/42" -> "films"
+    - "/v1/films/search?q=alien" -> "films"
+    - "/health" -> "health"
+    """
+    path = endpoint.split('?', 1)[0].strip('/')
+    parts = [part for part in path.split('/') if part]
+
+    if parts and parts[0] == 'v1':
+        parts = parts[1:]
+
+    return parts[0] if parts else 'default'
+
+
+def endpoint_key(endpoint: str, method: str = 'GET') -> str:
+    """
+    Normalize a request to an endpoint so that lookups of different IDs share latency
+    stats, while reads and writes of the same path are tracked apart.
+
+    Examples:
+    - "/v1/films/42" -> "GET /v1/films/{id}"
+    - "/v1/films/search?q=alien" -> "GET /v1/films/search"
+    - "/v1/rentals", "POST" -> "POST /v1/rentals"
+    """
+    path = re.sub(r'/\d+(?=/|$)', '/{id}', endpoint.split('?', 1)[0])
+    return f"{method.upper()} {path}"
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded concurrency limiter with a bounded wait queue.
+
+    At most ``max_concurrent`` callers hold a slot at once, at most ``max_queued``
+    callers wait for one, and nobody waits longer than ``queue_timeout`` seconds.
+    Callers that cannot be admitted are shed immediately so they can fail fast.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._shed = 0
+        self._total_queue_time = 0.0
+        self._max_queue_time = 0.0
+
+    def acquire(self) -> bool:
+        """
+        Wait for a slot.
+
+        Returns:
+            True if a slot was acquired, False if the request was shed
+        """
+        start = time.monotonic()
+
+        with self._cond:
+            if self._waiting == 0 and self._in_flight < self.max_concurrent:
+                self._admit(0.0)
+                return True
+
+            if self._waiting >= self.max_queued:
+                self._shed += 1
+                logger.warning("Shedding request for %s: queue is full (%d waiting)",
+                               self.name, self._waiting)
+                return False
+
+            self._waiting += 1
+            try:
+                deadline = start + self.queue_timeout
+                while self._in_flight >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._shed += 1
+                        logger.warning("Shedding request for %s: waited %.2fs for a slot",
+                                       self.name, time.monotonic() - start)
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._admit(time.monotonic() - start)
+            return True
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot only if one is free right now, without queueing or counting a shed.
+        """
+        with self._cond:
+            if self._waiting == 0 and self._in_flight < self.max_concurrent:
+                self._admit(0.0)
+                return True
+            return False
+
+    def release(self):
+        """Give a slot back and wake up queued callers."""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _admit(self, queue_time: float):
+        self._in_flight += 1
+        self._admitted += 1
+        self._total_queue_time += queue_time
+        self._max_queue_time = max(self._max_queue_time, queue_time)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the limiter's state and queue-time metrics.
+        """
+        with self._cond:
+            admitted = self._admitted
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queued': self.max_queued,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'admitted': admitted,
+                'shed': self._shed,
+                'avg_queue_ms': round(self._total_queue_time / admitted * 1000, 2) if admitted else 0.0,
+                'max_queue_ms': round(self._max_queue_time * 1000, 2),
+            }
+
+
+class LatencyTracker:
+    """
+    Rolling window of request latencies per endpoint, used to derive percentiles.
+    """
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        """Record how long a request to an endpoint took."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window_size)
+            samples.append(seconds)
+
+    def percentile(self, key: str, percent: float) -> Optional[float]:
+        """
+        Get a latency percentile in seconds.
+
+        Returns:
+            The percentile, or None until the endpoint has enough samples
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+
+        index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Sample counts and p50/p95/p99 in milliseconds for every endpoint.
+        """
+        with self._lock:
+            keys = sorted(self._samples)
+
+        result = {}
+        for key in keys:
+            entry = {'samples': len(self._samples[key])}
+            for percent in (50, 95, 99):
+                value = self.percentile(key, percent)
+                entry[f'p{percent}_ms'] = round(value * 1000, 2) if value is not None else None
+            result[key] = entry
+        return result
+
+
+class Backend:
+    """
+    State tracked for a single API replica.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def is_available(self, now: float) -> bool:
+        """Whether the replica may receive traffic (not ejected, or its ejection expired)."""
+        return now >= self.ejected_until
+
+
+class BackendPool:
+    """
+    Balances requests across API replicas and ejects unhealthy ones.
+
+    Replicas are ejected after ``eject_after_failures`` consecutive failures, or
+    when a health probe fails, and come back on their own once the ejection
+    expires. Ejection time doubles for replicas that keep failing, up to
+    ``max_eject_duration``.
+    """
+
+    LEAST_OUTSTANDING = 'least_outstanding'
+    LATENCY_WEIGHTED = 'latency_weighted'
+
+    def __init__(
+            self,
+            urls,
+            strategy: str = LEAST_OUTSTANDING,
+            eject_after_failures: int = 3,
+            eject_duration: float = 10,
+            max_eject_duration: float = 120,
+            latency_smoothing: float = 0.2
+            ):
+        if not urls:
+            raise ValueError("BackendPool needs at least one backend URL")
+
+        self.backends = [Backend(url) for url in urls]
+        self.strategy = strategy
+        self.eject_after_failures = eject_after_failures
+        self.eject_duration = eject_duration
+        self.max_eject_duration = max_eject_duration
+        self.latency_smoothing = latency_smoothing
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> List[str]:
+        """Base URLs of every replica in the pool."""
+        return [b.url for b in self.backends]
+
+    def choose(self, exclude=()) -> Backend:
+        """
+        Pick the replica for the next request and count it as outstanding.
+
+        Callers must pass the result to ``release`` when the request finishes.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = [b for b in self.backends if b.is_available(now) and b not in exclude]
+            if not candidates:
+                candidates = [b for b in self.backends if b.is_available(now)]
+            if not candidates:
+                # Everything is ejected: fail open on the replica that recovers first
+                candidates = [min(self.backends, key=lambda b: b.ejected_until)]
+
+            if self.strategy == self.LATENCY_WEIGHTED:
+                backend = min(candidates, key=self._expected_latency)
+            else:
+                backend = min(candidates, key=lambda b: (b.outstanding, b.ewma_latency or 0.0))
+
+            backend.outstanding += 1
+            return backend
+
+    def claim(self, backend: Backend):
+        """Count a request against a specific replica, bypassing selection (used by probes)."""
+        with self._lock:
+            backend.outstanding += 1
+
+    @staticmethod
+    def _expected_latency(backend: Backend) -> float:
+        # Replicas without samples yet are tried first so they get measured
+        return (backend.ewma_latency or 0.0) * (backend.outstanding + 1)
+
+    def release(self, backend: Backend, success: bool, latency: Optional[float] = None):
+        """
+        Finish a request on a replica and record whether it succeeded.
+
+        Args:
+            backend: Replica returned by ``choose``
+            success: False for connection errors, timeouts and 5xx responses
+            latency: Request duration in seconds, if a response was received
+        """
+        with self._lock:
+            backend.outstanding -= 1
+
+            if latency is not None:
+                if backend.ewma_latency is None:
+                    backend.ewma_latency = latency
+                else:
+                    backend.ewma_latency += self.latency_smoothing * (latency - backend.ewma_latency)
+
+            if success:
+                self._mark_healthy(backend)
+                return
+
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= self.eject_after_failures:
+                self._eject(backend, "%d consecutive failures" % backend.consecutive_failures)
+
+    def report_health(self, backend: Backend, healthy: bool):
+        """Record the result of an active health probe against a replica."""
+        with self._lock:
+            if healthy:
+                self._mark_healthy(backend)
+            else:
+                self._eject(backend, "failed health probe")
+
+    def _mark_healthy(self, backend: Backend):
+        if backend.ejected_until:
+            logger.info("Backend %s is healthy again", backend.url)
+        backend.consecutive_failures = 0
+        backend.ejected_until = 0.0
+        backend.ejections = 0
+
+    def _eject(self, backend: Backend, reason: str):
+        now = time.monotonic()
+        if now < backend.ejected_until:
+            return
+
+        duration = min(self.max_eject_duration, self.eject_duration * (2 ** backend.ejections))
+        backend.ejected_until = now + duration
+        backend.ejections += 1
+        logger.warning("Ejecting backend %s for %.0fs: %s", backend.url, duration, reason)
+
+    def stats(self):
+        """
+        Per-replica load, latency and health state.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'url': b.url,
+                    'healthy': b.is_available(now),
+                    'outstanding': b.outstanding,
+                    'ewma_latency_ms': round(b.ewma_latency * 1000, 2) if b.ewma_latency is not None else None,
+                    'consecutive_failures': b.consecutive_failures,
+                    'ejected_for_s': round(max(0.0, b.ejected_until - now), 1),
+                }
+                for b in self.backends
+            ]
@@ -0,0 +1,151 @@
+"""
+Precomputed table rows for the films, customers and rentals listings.
+
+Each backend item is turned into a flat dict of display-ready strings once per
+dataset version, so the row partials only print values and can be rendered by
+either the Django engine or the optional compiled engine (ROWS_TEMPLATE_ENGINE).
+"""
+import hashlib
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+from .cache import Dataset
+from .listing import TABLE_COLUMNS
+from .templatetags.format_filters import format_datetime, format_phone, truncate_smart
+
+# Partial templates rendering table rows, shared by the pages, ?format=rows and the live feed.
+# They may only use syntax that both the Django and Jinja2 engines understand.
+ROW_TEMPLATES = {
+    'films': 'pages/partials/film_rows.html',
+    'customers': 'pages/partials/customer_rows.html',
+    'rentals': 'pages/partials/rental_rows.html',
+}
+
+NOT_AVAILABLE = "N/A"
+
+# Output format of the format_datetime filter
+DATETIME_FORMAT = '%b %d, %Y %I:%M %p'
+
+# The ISO 8601 timestamps format_datetime parses: seconds and a zone are required,
+# fractions have at most 6 digits. fromisoformat also takes shapes the filter
+# leaves as they are (no zone, no seconds, ...), so only these use the fast path.
+ISO_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}:?\d{2})')
+
+
+def _or_na(value: Any) -> Any:
+    """Same as the |default:"N/A" filter."""
+    return value if value else NOT_AVAILABLE
+
+
+def _format_timestamp(value: Any) -> str:
+    """
+    Same as the format_datetime filter, with a fast path for ISO 8601 timestamps.
+
+    The backend sends ISO timestamps, which fromisoformat parses many times faster
+    than the filter's strptime loop; anything else goes through the filter.
+    """
+    if isinstance(value, str) and ISO_TIMESTAMP.fullmatch(value):
+        try:
+            return datetime.fromisoformat(value).strftime(DATETIME_FORMAT)
+        except ValueError:
+            pass
+    return format_datetime(value)
+
+
+def film_row(film: Dict[str, Any]) -> Dict[str, Any]:
+    """Display values for one film row."""
+    return {
+        'title': _or_na(film.get('title')),
+        'description': truncate_smart(film.get('description') or "No description available", 100),
+        'release_year': _or_na(film.get('release_year')),
+        'language': _or_na(film.get('language')),
+        'rating': _or_na(film.get('rating')),
+    }
+
+
+def customer_row(customer: Dict[str, Any]) -> Dict[str, Any]:
+    """Display values for one customer row."""
+    return {
+        'id': _or_na(customer.get('id')),
+        'first_name': _or_na(customer.get('first_name')),
+        'last_name': _or_na(customer.get('last_name')),
+        'email': _or_na(customer.get('email')),
+    }
+
+
+def rental_key(rental: Dict[str, Any]) -> Tuple:
+    """
+    Identify a rental across polls.
+
+    The rentals list carries no ID, so customer, title and rental date stand in
+    for one unless the backend sends an ID.
+    """
+    for id_field in ('rental_id', 'id'):
+        if rental.get(id_field) is not None:
+            return (id_field, rental[id_field])
+    return (rental.get('first_name'), rental.get('last_name'),
+            rental.get('title'), rental.get('rental_date'))
+
+
+def rental_row_key(rental: Dict[str, Any]) -> str:
+    """rental_key as a short string, for the row's data-key attribute."""
+    return hashlib.blake2b(repr(rental_key(rental)).encode(), digest_size=8).hexdigest()
+
+
+def rental_row(rental: Dict[str, Any]) -> Dict[str, Any]:
+    """Display values for one rental row; key lets the live feed replace it in place."""
+    return {
+        'key': rental_row_key(rental),
+        'first_name': _or_na(rental.get('first_name')),
+        'last_name': rental.get('last_name') or '',
+        'phone': format_phone(rental.get('phone')),
+        'rental_date': _format_timestamp(rental.get('rental_date')),
+        'title': rental.get('title') or '',
+    }
+
+
+ROW_BUILDERS = {
+    'films': film_row,
+    'customers': customer_row,
+    'rentals': rental_row,
+}
+
+
+def build_rows(name: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn backend items into display rows."""
+    builder = ROW_BUILDERS[name]
+    return [builder(item) for item in items]
+
+
+def dataset_rows(name: str, dataset: Dataset) -> List[Dict[str, Any]]:
+    """
+    Display rows for a whole dataset, built once per dataset version.
+
+    The rows line up with dataset.items, so pages can be sliced from either.
+    """
+    return dataset.derive('rows', lambda dataset: build_rows(name, dataset.items))
+
+
+def render_rows(name: str, rows: List[Dict[str, Any]], request=None,
+                columns: List[Tuple[str, str]] = None) -> SafeString:
+    """
+    Render display rows as <tr> elements.
+
+    Uses the ROWS_TEMPLATE_ENGINE engine when one is configured, else the first
+    engine that has the partial (the Django engine).
+
+    Args:
+        name: Listing name (films, customers or rentals)
+        rows: Display rows
+        request: Current request, if any
+        columns: (field, label) pairs to show; all of the table's columns by default
+    """
+    columns = [field for field, _ in (columns or TABLE_COLUMNS[name])]
+    engine = getattr(settings, 'ROWS_TEMPLATE_ENGINE', None)
+    html = render_to_string(ROW_TEMPLATES[name], {name: rows, 'columns': columns}, request=request, using=engine)
+    return mark_safe(html)
@@ -1,34 +1,234 @@
 """
 API service module for handling external API calls to the video rental backend.
 """
+import hashlib
+import json
 import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent import futures
 from typing import Dict, List, Optional, Tuple, Any
-import requests
+from urllib.parse import quote
+
+from django.utils.functional import SimpleLazyObject
+
+from . import idempotency
+from .cache import Dataset, DatasetCache, EntityCache, IdSet
+from .invalidation import ENTITY_DATASETS, InvalidationFeed
+from .snapshots import SnapshotStore
+from .resilience import (
+    Backend, BackendPool, ConcurrencyLimiter, LatencyTracker, endpoint_group, endpoint_key
+)
 
 logger = logging.getLogger(__name__)
 
+SERVICE_BUSY_MESSAGE = "The portal is handling too many API requests right now. Please try again in a moment."
+STATUS_ERROR_PREFIX = "API returned status code: "
+# Errors where the request never reached the API, so even a write can be resent
+CONNECT_ERROR_PREFIX = "Unable to connect to the API server"
+DUPLICATE_REQUEST_MESSAGE = "This request is already being submitted. Please wait for it to finish."
+UNCERTAIN_WRITE_MESSAGE = ("An earlier attempt may already have been applied, so it was not sent again. "
+                           "Check the list before submitting it again.")
+
 
 class APIConfig:
     """Configuration for API connections."""
     BASE_URL = "http://localhost:8080"
+    # API replicas to balance requests across; None means just BASE_URL
+    BASE_URLS = None
+    # 'least_outstanding' or 'latency_weighted'
+    LOAD_BALANCING = BackendPool.LEAST_OUTSTANDING
+    # Passive ejection: consecutive failures before a replica is taken out, and for how long (seconds)
+    EJECT_AFTER_FAILURES = 3
+    EJECT_DURATION = 10
+    MAX_EJECT_DURATION = 120
     HEADERS = {
         "Content-Type": "application/json",
         "X-API-Key": "secure-dev-key-123"
     }
     DEFAULT_TIMEOUT = 10
 
+    # Per endpoint group: (max concurrent requests, max queued requests)
+    CONCURRENCY_LIMITS = {
+        'films': (8, 16),
+        'customers': (8, 16),
+        'rentals': (4, 8),
+        'inventory': (4, 16),
+        'health': (2, 4),
+        'default': (8, 16),
+    }
+    # Longest a request may wait in the queue before it is shed (seconds)
+    QUEUE_TIMEOUT = 2
+
+    # Adaptive timeouts: once an endpoint has enough samples its timeout becomes
+    # p99 latency * multiplier, kept between MIN_TIMEOUT and DEFAULT_TIMEOUT
+    ADAPTIVE_TIMEOUTS = True
+    ADAPTIVE_TIMEOUT_MULTIPLIER = 3
+    MIN_TIMEOUT = 1
+    LATENCY_WINDOW = 200
+    LATENCY_MIN_SAMPLES = 20
+
+    # Hedged requests: idempotent lookups slower than the endpoint's p95 get a
+    # second attempt, and whichever answers first wins
+    HEDGE_REQUESTS = True
+    HEDGE_MIN_DELAY = 0.05
+
+    # List endpoints cached in-process as versioned datasets
+    LIST_ENDPOINTS = {
+        'films': '/v1/films',
+        'customers': '/v1/customers',
+        'rentals': '/v1/rentals',
+    }
+    # Seconds a fetched list is served from the cache
+    LIST_CACHE_TTL = 30
+    # Shared snapshot file holding the last-known-good lists for every worker on the host
+    SNAPSHOT_PATH = os.path.join(tempfile.gettempdir(), 'video-rental-portal-snapshots.sqlite3')
+    # Seconds the snapshot writer lease lasts without being renewed
+    SNAPSHOT_LEASE = 30
+    # Seconds to serve the last-known-good list before retrying a failed fetch
+    FAILED_FETCH_BACKOFF = 5
+    # Seconds a single film/customer looked up by ID is served from the cache
+    ENTITY_CACHE_TTL = 300
+    # Seconds an ID the API answered 404 for is rejected without asking again
+    MISSING_ID_TTL = 60
+    # Seconds between checks of the shared invalidation log
+    INVALIDATION_POLL_INTERVAL = 1
+    # Up to this many changed customers are patched into the cached list in
+    # place; larger changes drop the list instead
+    INVALIDATION_PATCH_LIMIT = 20
+
+    # Availability of one film's copies across stores, looked up by film ID
+    INVENTORY_ENDPOINT = '/v1/inventory/available?film_id={film_id}'
+    # Seconds a film's availability is served from the cache; new rentals drop it sooner
+    INVENTORY_CACHE_TTL = 15
+    # Parallel inventory lookups per availability check
+    INVENTORY_MAX_PARALLEL = 4
+
+    # Bulk writes: parallel submissions per batch, retries per item when the request
+    # never reached the API, and how long (seconds) idempotency keys are remembered
+    # host-wide (in the SNAPSHOT_PATH file) so resubmits are not sent twice
+    BULK_MAX_PARALLEL = 3
+    WRITE_RETRIES = 2
+    WRITE_RETRY_BACKOFF = 0.5
+    IDEMPOTENCY_TTL = 600
+
 
 class APIService:
     """Service class for handling API requests to the video rental backend."""
 
     def __init__(self, config: APIConfig = None):
         self.config = config or APIConfig()
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        self.backends = BackendPool(
+            self.config.BASE_URLS or [self.config.BASE_URL],
+            strategy=self.config.LOAD_BALANCING,
+            eject_after_failures=self.config.EJECT_AFTER_FAILURES,
+            eject_duration=self.config.EJECT_DURATION,
+            max_eject_duration=self.config.MAX_EJECT_DURATION
+        )
+        self._latency = LatencyTracker(self.config.LATENCY_WINDOW, self.config.LATENCY_MIN_SAMPLES)
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._hedges_sent = 0
+        self._hedges_won = 0
+        self._datasets = DatasetCache(self.config.LIST_CACHE_TTL)
+        self._fetch_locks = {name: threading.Lock() for name in self.config.LIST_ENDPOINTS}
+        self._entities = EntityCache(self.config.ENTITY_CACHE_TTL)
+        self._missing = EntityCache(self.config.MISSING_ID_TTL)
+        self._inventory = EntityCache(self.config.INVENTORY_CACHE_TTL)
+        self._snapshots = SnapshotStore(self.config.SNAPSHOT_PATH, self.config.SNAPSHOT_LEASE)
+        self._retry_fetch_at: Dict[str, float] = {}
+        self._invalidations = InvalidationFeed(self.config.INVALIDATION_POLL_INTERVAL)
+        self._idempotency = idempotency.IdempotencyStore(self.config.SNAPSHOT_PATH, self.config.IDEMPOTENCY_TTL)
+
+    @staticmethod
+    def is_busy_error(error_message: Optional[str]) -> bool:
+        """
+        Check whether an error message means the request was shed by the concurrency limits.
+        """
+        return error_message == SERVICE_BUSY_MESSAGE
+
+    def _get_limiter(self, group: str) -> ConcurrencyLimiter:
+        """
+        Get (or lazily create) the concurrency limiter for an endpoint group.
+        """
+        limiter = self._limiters.get(group)
+        if limiter is not None:
+            return limiter
+
+        with self._limiters_lock:
+            limiter = self._limiters.get(group)
+            if limiter is None:
+                limits = self.config.CONCURRENCY_LIMITS
+                max_concurrent, max_queued = limits.get(group, limits['default'])
+                limiter = ConcurrencyLimiter(group, max_concurrent, max_queued,
+                                             self.config.QUEUE_TIMEOUT)
+                self._limiters[group] = limiter
+            return limiter
+
+    def get_concurrency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get queue and load-shedding metrics for every endpoint group used so far.
+        """
+        return {group: limiter.stats() for group, limiter in sorted(self._limiters.items())}
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """
+        Get rolling latency percentiles, current timeouts and hedging counters.
+        """
+        endpoints = self._latency.stats()
+        for key, entry in endpoints.items():
+            entry['timeout_s'] = round(self._get_timeout(key), 3)
+
+        return {
+            'endpoints': endpoints,
+            'hedges_sent': self._hedges_sent,
+            'hedges_won': self._hedges_won,
+        }
+
+    def _get_timeout(self, key: str) -> float:
+        """
+        Get the timeout for an endpoint and method (see endpoint_key), derived from
+        their recent latency when possible.
+        """
+        if not self.config.ADAPTIVE_TIMEOUTS:
+            return self.config.DEFAULT_TIMEOUT
+
+        p99 = self._latency.percentile(key, 99)
+        if p99 is None:
+            return self.config.DEFAULT_TIMEOUT
+
+        timeout = p99 * self.config.ADAPTIVE_TIMEOUT_MULTIPLIER
+        return min(self.config.DEFAULT_TIMEOUT, max(self.config.MIN_TIMEOUT, timeout))
+
+    def _get_hedge_executor(self) -> futures.ThreadPoolExecutor:
+        """
+        Get (or lazily create) the thread pool used for hedged requests.
+
+        Every attempt in the pool holds a limiter slot, so one thread per slot
+        means an attempt never queues for a thread, which would both delay it
+        and count against the p95 hedge timer. Threads are started on demand.
+        """
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                slots = sum(max_concurrent for max_concurrent, _ in self.config.CONCURRENCY_LIMITS.values())
+                self._hedge_executor = futures.ThreadPoolExecutor(
+                    max_workers=slots,
+                    thread_name_prefix='api-hedge'
+                )
+            return self._hedge_executor
 
     def _make_request(
             self,
             endpoint: str,
             method: str = 'GET',
-            data: Dict = None
+            data: Dict = None,
+            hedge: bool = False,
+            headers: Dict = None
             ) -> Tuple[Optional[Any], Optional[str]]:
         """
         Make a request to the API and handle common errors.
@@ -37,60 +237,174 @@ class APIService:
             endpoint: API endpoint path (e.g., '/v1/films')
             method: HTTP method (GET, POST, PUT, DELETE)
             data: Request data for POST/PUT requests
+            hedge: Allow a hedged second attempt (idempotent GETs only)
+            headers: Extra request headers (e.g., Idempotency-Key)
             
         Returns:
             Tuple of (response_data, error_message)
             - response_data: Parsed JSON response or None if error
             - error_message: Error description or None if successful
         """
-        url = f"{self.config.BASE_URL}{endpoint}"
+        limiter = self._get_limiter(endpoint_group(endpoint))
+        if not limiter.acquire():
+            logger.error("Load shed for %s %s", method, endpoint)
+            return None, SERVICE_BUSY_MESSAGE
+
+        if hedge and method.upper() == 'GET' and self.config.HEDGE_REQUESTS:
+            # Releases the slot itself, once the attempt holding it has finished
+            return self._send_hedged_request(endpoint, limiter)
+
+        try:
+            return self._send_request(endpoint, method, data, headers=headers)
+        finally:
+            limiter.release()
+
+    def _send_hedged_request(
+            self,
+            endpoint: str,
+            limiter: ConcurrencyLimiter
+            ) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Send a GET and, if it is slower than the endpoint's p95, race a second attempt.
+
+        Takes over the limiter slot the caller acquired. Each attempt holds a slot
+        until it finishes, even after the other one has answered, and the hedge
+        only goes out when the endpoint group has a free slot, so hedging never
+        pushes the backend past its concurrency limit.
+        """
+        p95 = self._latency.percentile(endpoint_key(endpoint), 95)
+        if p95 is None:
+            try:
+                return self._send_request(endpoint)
+            finally:
+                limiter.release()
+
+        try:
+            executor = self._get_hedge_executor()
+            first_backend = self.backends.choose()
+            first = executor.submit(self._send_request, endpoint, backend=first_backend)
+        except BaseException:
+            limiter.release()
+            raise
+        first.add_done_callback(lambda _: limiter.release())
+
+        try:
+            return first.result(timeout=max(p95, self.config.HEDGE_MIN_DELAY))
+        except futures.TimeoutError:
+            pass
+
+        if not limiter.try_acquire():
+            return first.result()
+
+        self._hedges_sent += 1
+        logger.info("Hedging slow GET request to %s after %.3fs", endpoint, p95)
+        # Prefer a different replica for the hedge
+        second_backend = self.backends.choose(exclude=(first_backend,))
+        second = executor.submit(self._send_request, endpoint, backend=second_backend)
+        second.add_done_callback(lambda _: limiter.release())
+
+        done, _ = futures.wait([first, second], return_when=futures.FIRST_COMPLETED)
+        winner = second if second in done and first not in done else first
+        result = winner.result()
+
+        if result[1] is not None:
+            # The faster attempt failed; the slower one may still succeed
+            other = first if winner is second else second
+            other_result = other.result()
+            if other_result[1] is None:
+                winner, result = other, other_result
+
+        if winner is second:
+            self._hedges_won += 1
+        return result
+
+    def _send_request(
+            self,
+            endpoint: str,
+            method: str = 'GET',
+            data: Dict = None,
+            backend: Backend = None,
+            headers: Dict = None
+            ) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Send a single request to one API replica, see _make_request for the return value.
+
+        Args:
+            backend: Replica already chosen from the pool; picked here when omitted
+            headers: Extra request headers
+        """
+        # Imported on first use so worker boot doesn't pay for requests/urllib3
+        import requests
+
+        if backend is None:
+            backend = self.backends.choose()
+
+        url = f"{backend.url}{endpoint}"
+        request_headers = {**self.config.HEADERS, **(headers or {})}
         error_message = None
         response_data = None
+        latency_key = endpoint_key(endpoint, method)
+        timeout = self._get_timeout(latency_key)
+        start = time.monotonic()
+        # Connection errors, timeouts and 5xx responses count against the replica
+        backend_ok = False
+        latency = None
 
         try:
             if method.upper() == 'GET':
                 response = requests.get(
                     url,
-                    headers=self.config.HEADERS,
-                    timeout=self.config.DEFAULT_TIMEOUT
+                    headers=request_headers,
+                    timeout=timeout
                 )
             elif method.upper() == 'POST':
                 response = requests.post(
                     url,
-                    headers=self.config.HEADERS,
+                    headers=request_headers,
                     json=data,
-                    timeout=self.config.DEFAULT_TIMEOUT
+                    timeout=timeout
                 )
             elif method.upper() == 'PUT':
                 response = requests.put(
                     url,
-                    headers=self.config.HEADERS,
+                    headers=request_headers,
                     json=data,
-                    timeout=self.config.DEFAULT_TIMEOUT
+                    timeout=timeout
                 )
             elif method.upper() == 'DELETE':
                 response = requests.delete(
                     url,
-                    headers=self.config.HEADERS,
-                    timeout=self.config.DEFAULT_TIMEOUT
+                    headers=request_headers,
+                    timeout=timeout
                 )
             else:
                 error_message = f"Unsupported HTTP method: {method}"
                 logger.error(error_message)
+                backend_ok = True
                 return None, error_message
 
-            if response.status_code == 200:
-                response_data = response.json()
+            latency = time.monotonic() - start
+            self._latency.record(latency_key, latency)
+            backend_ok = response.status_code < 500
+
+            if 200 <= response.status_code < 300:
+                # Writes may answer 201/204, possibly without a body
+                response_data = response.json() if response.content else {}
                 logger.info("Successfully completed %s request to %s", method, endpoint)
             else:
-                error_message = f"API returned status code: {response.status_code}"
+                error_message = f"{STATUS_ERROR_PREFIX}{response.status_code}"
                 logger.error("API error for %s %s: %s", method, endpoint, error_message)
 
-        except requests.exceptions.ConnectionError:
-            error_message = f"Unable to connect to the API server at {self.config.BASE_URL}. \
-                              Please ensure the API is running."
+        except requests.exceptions.ConnectionError as e:
+            if self._failed_to_connect(e):
+                error_message = f"{CONNECT_ERROR_PREFIX} at {backend.url}. \
+                                  Please ensure the API is running."
+            else:
+                # The request may have reached the API before the connection dropped
+                error_message = f"The connection to the API server at {backend.url} was lost: {e}"
             logger.error("Connection error for %s %s: %s", method, endpoint, error_message)
         except requests.exceptions.Timeout:
+            self._latency.record(latency_key, timeout)
             error_message = "Request timed out. The API server may be slow to respond."
             logger.error("Timeout error for %s %s: %s", method, endpoint, error_message)
         except requests.exceptions.RequestException as e:
@@ -99,29 +413,267 @@ class APIService:
         except ValueError as e:
             error_message = f"Invalid JSON response: {str(e)}"
             logger.error("JSON parsing error for %s %s: %s", method, endpoint, error_message)
+        finally:
+            self.backends.release(backend, success=backend_ok, latency=latency)
 
         return response_data, error_message
 
-    def get_films(self) -> Tuple[List[Dict], Optional[str]]:
+    @staticmethod
+    def _failed_to_connect(error: Exception) -> bool:
         """
-        Get all films from the API.
-        
+        Whether a requests ConnectionError happened before any of the request was sent
+        (connection refused, DNS failure, connect timeout).
+        """
+        import requests
+        from urllib3.exceptions import NewConnectionError
+
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def get_dataset(self, name: str, max_age: float = None) -> Tuple[Optional[Dataset], Optional[str]]:
+        """
+        Get a list dataset (films, customers or rentals), served from the cache when fresh.
+
+        Concurrent misses for the same dataset share a single upstream fetch, and a
+        fresh snapshot saved by another worker is used instead of fetching. When the
+        fetch fails, the last-known-good copy is returned instead of an error; check
+        is_stale() to tell the user.
+
+        Args:
+            name: Key of APIConfig.LIST_ENDPOINTS
+            max_age: Refetch if the cached copy is older than this many seconds
+
         Returns:
-            Tuple of (films_list, error_message)
+            Tuple of (dataset, error_message)
+        """
+        self.sync_invalidations()
+
+        dataset = self._datasets.get(name, max_age)
+        if dataset is not None:
+            return dataset, None
+
+        if time.monotonic() < self._retry_fetch_at.get(name, 0):
+            fallback = self._last_known_good(name)
+            if fallback is not None:
+                return fallback, None
+
+        with self._fetch_locks[name]:
+            dataset = self._datasets.get(name, max_age) or self._shared_snapshot(name, max_age)
+            if dataset is not None:
+                return dataset, None
+
+            items, error_message = self._fetch_list(name)
+            if error_message:
+                self._retry_fetch_at[name] = time.monotonic() + self.config.FAILED_FETCH_BACKOFF
+                fallback = self._last_known_good(name)
+                if fallback is None:
+                    return None, error_message
+
+                logger.warning("Serving last-known-good %s from %.0fs ago: %s",
+                               name, fallback.age, error_message)
+                return fallback, None
+
+            self._retry_fetch_at.pop(name, None)
+            dataset = self._datasets.put(name, items)
+            self._forget_missing(name)
+            self._snapshots.write(name, items, dataset.fetched_at)
+            return dataset, None
+
+    def peek_dataset(self, name: str) -> Optional[Dataset]:
+        """
+        This worker's latest copy of a list dataset regardless of age, without fetching.
+        """
+        return self._datasets.peek(name)
+
+    def is_stale(self, dataset: Dataset) -> bool:
         """
-        response_data, error_message = self._make_request('/v1/films')
+        Whether a dataset is a last-known-good copy, older than the cache TTL.
+        """
+        return dataset.age > self.config.LIST_CACHE_TTL
+
+    def _shared_snapshot(self, name: str, max_age: float = None) -> Optional[Dataset]:
+        """
+        Adopt a snapshot another worker saved, if it is still fresh.
+        """
+        limit = self.config.LIST_CACHE_TTL if max_age is None else min(max_age, self.config.LIST_CACHE_TTL)
+        meta = self._snapshots.read_meta(name)
+        if meta is None or meta.invalidated or meta.age > limit:
+            return None
+
+        snapshot = self._snapshots.read(name)
+        if snapshot is None:
+            return None
+
+        items, meta = snapshot
+        logger.info("Using %s snapshot version %d from a sibling worker", name, meta.version)
+        dataset = self._datasets.put(name, items, fetched_at=meta.fetched_at)
+        self._forget_missing(name)
+        return dataset
+
+    def _last_known_good(self, name: str) -> Optional[Dataset]:
+        """
+        Newest copy of a dataset regardless of age: our own or the shared snapshot.
+        """
+        local = self._datasets.peek(name)
+        meta = self._snapshots.read_meta(name)
+        if meta is None or (local is not None and local.fetched_at >= meta.fetched_at):
+            return local
+
+        snapshot = self._snapshots.read(name)
+        if snapshot is None:
+            return local
+
+        items, meta = snapshot
+        # Keep it in our cache (it stays stale by age) so it is decoded only once
+        return self._datasets.put(name, items, fetched_at=meta.fetched_at)
+
+    def _fetch_list(self, name: str) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch a full list from the API and check that it is a list.
+        """
+        response_data, error_message = self._make_request(self.config.LIST_ENDPOINTS[name])
 
         if response_data is not None:
             if isinstance(response_data, list):
-                logger.info("Retrieved %d films from API", len(response_data))
+                logger.info("Retrieved %d %s from API", len(response_data), name)
                 return response_data, None
 
-            error_message = "Expected list of films but received different format"
+            error_message = f"Expected list of {name} but received different format"
             logger.error(error_message)
             return [], error_message
 
         return [], error_message
 
+    def invalidate_dataset(self, name: str = None, changed_at: Optional[float] = None):
+        """
+        Drop a cached list dataset (or all of them) so the next read refetches it.
+
+        The shared snapshot is flagged too, so no worker adopts it as fresh; it
+        stays available as the last-known-good copy.
+
+        Args:
+            name: Dataset to drop, or None for all of them
+            changed_at: When the change was published; a snapshot a sibling saved
+                since then is not flagged, so workers that apply the event late
+                adopt it instead of refetching
+        """
+        self._datasets.invalidate(name)
+        for dataset_name in ([name] if name else self.config.LIST_ENDPOINTS):
+            self._snapshots.mark_invalidated(dataset_name, changed_at)
+
+        if name in (None, 'rentals'):
+            # Renting or returning a copy changes availability
+            self._inventory.invalidate_type('inventory')
+
+        self._forget_missing(name)
+
+    def _forget_missing(self, name: str = None):
+        """
+        Drop the IDs remembered as missing for a dataset's entity type (or all types),
+        as they may exist in a newer copy of the list.
+        """
+        if name is None:
+            self._missing.invalidate_type()
+        for entity_type, dataset_name in ENTITY_DATASETS.items():
+            if dataset_name == name:
+                self._missing.invalidate_type(entity_type)
+
+    def sync_invalidations(self, force: bool = False):
+        """
+        Apply invalidation events published by any worker since the last check.
+
+        Args:
+            force: Check the shared log even if the poll interval hasn't elapsed
+        """
+        events = self._invalidations.poll(force=force)
+        if events:
+            self.apply_invalidations(events)
+
+    def apply_invalidations(self, events: List[Dict[str, Any]]):
+        """
+        Evict or refresh the cached entries affected by backend change events.
+
+        Films and customers looked up by ID are evicted individually. Changed
+        customers are patched into the cached customers list (it carries IDs);
+        the films and rentals lists carry no IDs, so they are dropped.
+
+        Args:
+            events: Events like {"type": "customer", "ids": [5, 7]}; empty ids means all,
+                and an optional published_at limits which shared snapshots are flagged
+        """
+        for event in events:
+            entity_type, ids = event['type'], event['ids']
+            changed_at = event.get('published_at')
+            dataset_name = ENTITY_DATASETS[entity_type]
+
+            if ids:
+                for entity_id in ids:
+                    self._entities.invalidate((entity_type, entity_id))
+                    self._missing.invalidate((entity_type, entity_id))
+            else:
+                self._entities.invalidate_type(entity_type)
+                self._missing.invalidate_type(entity_type)
+
+            if entity_type == 'customer' and 0 < len(ids) <= self.config.INVALIDATION_PATCH_LIMIT:
+                self._patch_customers(ids, changed_at)
+            else:
+                self.invalidate_dataset(dataset_name, changed_at)
+
+            logger.info("Invalidated %s %s", entity_type, ids or 'all')
+
+    def _patch_customers(self, customer_ids: List[int], changed_at: Optional[float] = None):
+        """
+        Refetch changed customers and swap them into the cached list as a new version.
+        """
+        dataset = self._datasets.get('customers')
+        if dataset is None:
+            # Nothing fresh to patch here; make sure no worker adopts the shared
+            # snapshot as fresh unless it was brought up to date after the change
+            self.invalidate_dataset('customers', changed_at)
+            return
+
+        changed = {}
+        for customer_id in customer_ids:
+            customer, error_message = self._make_request(f'/v1/customers/{customer_id}')
+            if error_message == f"{STATUS_ERROR_PREFIX}404":
+                changed[customer_id] = None  # deleted
+            elif error_message or not isinstance(customer, dict):
+                # Can't tell what the customer looks like now: drop the whole list
+                self.invalidate_dataset('customers', changed_at)
+                return
+            else:
+                changed[customer_id] = customer
+                self._entities.put(('customer', customer_id), customer)
+
+        items = []
+        for item in dataset.items:
+            customer_id = item.get('id')
+            if customer_id in changed:
+                customer = changed.pop(customer_id)
+                if customer is not None:
+                    items.append(customer)
+            else:
+                items.append(item)
+        items.extend(customer for customer in changed.values() if customer is not None)
+
+        patched = self._datasets.put('customers', items, fetched_at=dataset.fetched_at)
+        if not self._snapshots.write('customers', patched.items, patched.fetched_at, updated_at=time.time()):
+            # Another worker holds the writer lease: the shared copy is outdated
+            # unless that worker has brought it up to date since the change
+            self._snapshots.mark_invalidated('customers', changed_at)
+
+    def get_films(self) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get all films from the API.
+        
+        Returns:
+            Tuple of (films_list, error_message)
+        """
+        dataset, error_message = self.get_dataset('films')
+        return (dataset.items if dataset else []), error_message
+
     def get_film_by_id(self, film_id: int) -> Tuple[Optional[Dict], Optional[str]]:
         """
         Get a specific film by ID.
@@ -130,9 +682,23 @@ class APIService:
             film_id: The ID of the film to retrieve
             
         Returns:
-            Tuple of (film_data, error_message)
+            Tuple of (film_data, error_message); both are None if there is no such film
         """
-        response_data, error_message = self._make_request(f'/v1/films/{film_id}')
+        self.sync_invalidations()
+
+        cached = self._entities.get(('film', film_id))
+        if cached is not None:
+            return cached, None
+
+        if self.is_known_missing('film', film_id):
+            return None, None
+
+        response_data, error_message = self._make_request(f'/v1/films/{film_id}', hedge=True)
+        if error_message == f"{STATUS_ERROR_PREFIX}404":
+            self._missing.put(('film', film_id), True)
+            return None, None
+        if error_message is None and response_data:
+            self._entities.put(('film', film_id), response_data)
         return response_data, error_message
 
     def search_films(self, query: str) -> Tuple[List[Dict], Optional[str]]:
@@ -145,7 +711,7 @@ class APIService:
         Returns:
             Tuple of (films_list, error_message)
         """
-        response_data, error_message = self._make_request(f'/v1/films/search?q={query}')
+        response_data, error_message = self._make_request(f'/v1/films/search?q={quote(query)}')
 
         if response_data is not None:
             if isinstance(response_data, list):
@@ -164,17 +730,8 @@ class APIService:
         Returns:
             Tuple of (customers_list, error_message)
         """
-        response_data, error_message = self._make_request('/v1/customers')
-
-        if response_data is not None:
-            if isinstance(response_data, list):
-                logger.info("Retrieved %d customers from API", len(response_data))
-                return response_data, None
-            error_message = "Expected list of customers but received different format"
-            logger.error(error_message)
-            return [], error_message
-
-        return [], error_message
+        dataset, error_message = self.get_dataset('customers')
+        return (dataset.items if dataset else []), error_message
     
     def get_customer_by_id(self, customer_id: int) -> Tuple[Optional[Dict], Optional[str]]:
         """
@@ -184,9 +741,23 @@ class APIService:
             customer_id: The ID of the customer to retrieve
             
         Returns:
-            Tuple of (customer_data, error_message)
+            Tuple of (customer_data, error_message); both are None if there is no such customer
         """
-        response_data, error_message = self._make_request(f'/v1/customers/{customer_id}')
+        self.sync_invalidations()
+
+        cached = self._entities.get(('customer', customer_id))
+        if cached is not None:
+            return cached, None
+
+        if self.is_known_missing('customer', customer_id):
+            return None, None
+
+        response_data, error_message = self._make_request(f'/v1/customers/{customer_id}', hedge=True)
+        if error_message == f"{STATUS_ERROR_PREFIX}404":
+            self._missing.put(('customer', customer_id), True)
+            return None, None
+        if error_message is None and response_data:
+            self._entities.put(('customer', customer_id), response_data)
         return response_data, error_message
     
     def get_rentals(self) -> Tuple[List[Dict], Optional[str]]:
@@ -196,32 +767,409 @@ class APIService:
         Returns:
             Tuple of (rentals_list, error_message)
         """
-        response_data, error_message = self._make_request('/v1/rentals')
+        dataset, error_message = self.get_dataset('rentals')
+        return (dataset.items if dataset else []), error_message
 
-        if response_data is not None:
-            if isinstance(response_data, list):
-                logger.info("Retrieved %d rentals from API", len(response_data))
-                return response_data, None
-            error_message = "Expected list of rentals but received different format"
+    @staticmethod
+    def entity_id_of(item: Dict) -> Optional[int]:
+        """
+        Get a film's or customer's ID, or None: the films list doesn't carry
+        one, but other endpoints may send film_id or id.
+        """
+        for id_field in ('film_id', 'customer_id', 'id'):
+            if isinstance(item.get(id_field), int):
+                return item[id_field]
+        return None
+
+    @classmethod
+    def _build_id_set(cls, dataset: Dataset) -> Optional[IdSet]:
+        """Known IDs of a list, or None if some items carry no ID (like the films list)."""
+        ids = []
+        for item in dataset.items:
+            entity_id = cls.entity_id_of(item)
+            if entity_id is None or entity_id < 0:
+                return None
+            ids.append(entity_id)
+        return IdSet(ids)
+
+    def is_known_missing(self, entity_type: str, entity_id: int) -> bool:
+        """
+        Whether a film or customer ID can be rejected without asking the API.
+
+        It can if the API answered 404 for it within MISSING_ID_TTL, or if the
+        fresh cached list has IDs and this one falls in a gap below the largest.
+        Lists are never fetched just for this check, and stale last-known-good
+        copies are not trusted.
+
+        Args:
+            entity_type: 'film' or 'customer'
+            entity_id: The ID to check
+        """
+        if self._missing.get((entity_type, entity_id)) is not None:
+            return True
+
+        dataset = self._datasets.get(ENTITY_DATASETS[entity_type])
+        if dataset is None:
+            return False
+
+        known_ids = dataset.derive('id_set', self._build_id_set)
+        return known_ids is not None and not known_ids.might_exist(entity_id)
+
+    @classmethod
+    def _build_film_index(cls, dataset: Dataset) -> Tuple[Dict[str, Dict], Dict[int, Dict]]:
+        """Index the films catalog by case-folded title and, where known, by ID."""
+        by_title, by_id = {}, {}
+        for film in dataset.items:
+            if film.get('title'):
+                by_title.setdefault(film['title'].casefold(), film)
+            film_id = cls.entity_id_of(film)
+            if film_id is not None:
+                by_id[film_id] = film
+        return by_title, by_id
+
+    def resolve_film(
+            self,
+            query: Tuple[str, Any],
+            by_title: Dict[str, Dict],
+            by_id: Dict[int, Dict]
+            ) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """
+        Resolve a film ID or title to an ID through the local catalog.
+
+        Titles the catalog knows but can't give an ID for are looked up with the
+        search endpoint.
+
+        Args:
+            query: ('id', film_id) or ('title', title)
+            by_title: Catalog index by case-folded title (empty if the catalog is unavailable)
+            by_id: Catalog index by film ID
+
+        Returns:
+            Tuple of (film_id, title, error_message)
+        """
+        kind, value = query
+        if kind == 'id':
+            if self.is_known_missing('film', value):
+                return value, None, f"No film found with ID: {value}"
+            film = by_id.get(value)
+            return value, (film.get('title') if film else None), None
+
+        film = by_title.get(value.casefold())
+        if film is None and by_title:
+            return None, value, f'No film titled "{value}" in the catalog'
+
+        title = film['title'] if film else value
+        film_id = self.entity_id_of(film) if film else None
+        if film_id is not None:
+            return film_id, title, None
+
+        matches, error_message = self.search_films(title)
+        if error_message:
+            return None, title, error_message
+        for match in matches:
+            if (match.get('title') or '').casefold() == title.casefold() and self.entity_id_of(match) is not None:
+                return self.entity_id_of(match), match['title'], None
+
+        return None, title, f'Could not find the ID of "{title}"'
+
+    def get_film_inventory(self, film_id: int) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """
+        Get the inventory copies of a film, cached for INVENTORY_CACHE_TTL.
+        
+        Args:
+            film_id: The ID of the film
+            
+        Returns:
+            Tuple of (copies, error_message)
+        """
+        self.sync_invalidations()
+
+        cached = self._inventory.get(('inventory', film_id))
+        if cached is not None:
+            return cached, None
+
+        endpoint = self.config.INVENTORY_ENDPOINT.format(film_id=film_id)
+        response_data, error_message = self._make_request(endpoint, hedge=True)
+        if error_message:
+            return None, error_message
+        if not isinstance(response_data, list):
+            error_message = "Expected list of inventory copies but received different format"
             logger.error(error_message)
-            return [], error_message
+            return None, error_message
 
-        return [], error_message
+        self._inventory.put(('inventory', film_id), response_data)
+        return response_data, None
+
+    def check_availability(self, queries: List[Tuple[str, Any]]) -> List[Dict]:
+        """
+        Look up the inventory of many films at once.
+
+        Titles are resolved through the cached films catalog, then the films'
+        inventories are fetched concurrently, INVENTORY_MAX_PARALLEL at a time.
+
+        Args:
+            queries: ('id', film_id) or ('title', title) tuples
+
+        Returns:
+            One result per query, in input order, with keys query, film_id,
+            title, copies and error
+        """
+        if not queries:
+            return []
+
+        dataset, error_message = self.get_dataset('films')
+        if dataset is not None:
+            by_title, by_id = dataset.derive('film_index', self._build_film_index)
+        else:
+            logger.warning("Checking availability without the films catalog: %s", error_message)
+            by_title, by_id = {}, {}
+
+        def check(query):
+            film_id, title, error_message = self.resolve_film(query, by_title, by_id)
+            copies = None
+            if error_message is None:
+                copies, error_message = self.get_film_inventory(film_id)
+            return {
+                'query': query[1],
+                'film_id': film_id,
+                'title': title,
+                'copies': copies or [],
+                'error': error_message,
+            }
+
+        max_workers = max(1, min(self.config.INVENTORY_MAX_PARALLEL, len(queries)))
+        with futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api-inventory') as executor:
+            return list(executor.map(check, queries))
+
+    @staticmethod
+    def make_idempotency_key(batch_key: str, index: int, item: Dict) -> str:
+        """
+        Build a stable idempotency key for one item of a batch.
+
+        Resubmitting the same batch yields the same keys, while editing an item
+        changes its key so the edited version is sent.
+        """
+        digest = hashlib.sha256(json.dumps(item, sort_keys=True).encode()).hexdigest()[:16]
+        return f"{batch_key}-{index}-{digest}"
+
+    @staticmethod
+    def _is_retryable_error(error_message: str) -> bool:
+        """
+        Whether a failed write is safe to resend: only when it never left the portal
+        (load shed) or never reached the API (connection not established).
+
+        Timeouts, dropped connections and 5xx responses may come after the API
+        applied the write, so they are reported rather than retried.
+        """
+        return error_message == SERVICE_BUSY_MESSAGE or error_message.startswith(CONNECT_ERROR_PREFIX)
+
+    @staticmethod
+    def _created_nothing(error_message: str) -> bool:
+        """Whether a failed write certainly created nothing: never sent, or rejected with a 4xx."""
+        return (APIService._is_retryable_error(error_message)
+                or error_message.startswith(STATUS_ERROR_PREFIX + '4'))
+
+    def _submit_idempotent(
+            self,
+            endpoint: str,
+            data: Dict,
+            idempotency_key: str
+            ) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        POST once per idempotency key across every worker on the host, retrying
+        with the same key only failures where the request was never sent (see
+        _is_retryable_error).
+
+        The key is claimed in the shared IdempotencyStore before sending, so:
+        - a key that already succeeded returns the stored result without calling the API
+        - a key still being submitted (e.g. a double-clicked form) is rejected
+        - a key whose request may have reached the API (timeout, dropped connection,
+          5xx) is never sent again until it expires
+        Keys whose request certainly created nothing are released for a resubmit.
+        The Idempotency-Key header is sent too, for backends that honour it.
+        """
+        try:
+            state, stored = self._idempotency.claim(idempotency_key)
+        except sqlite3.Error as e:
+            logger.error("Could not claim idempotency key %s: %s", idempotency_key, e)
+            return None, "Could not record the submission, so it was not sent. Please try again."
+
+        if state == idempotency.DONE:
+            logger.info("Replaying result for idempotency key %s", idempotency_key)
+            return stored, None
+        if state == idempotency.IN_FLIGHT:
+            logger.warning("Rejected duplicate submission for idempotency key %s", idempotency_key)
+            return None, DUPLICATE_REQUEST_MESSAGE
+        if state == idempotency.UNCERTAIN:
+            logger.warning("Not resending idempotency key %s: outcome unknown", idempotency_key)
+            return None, UNCERTAIN_WRITE_MESSAGE
+
+        response_data = None
+        error_message = None
+        headers = {'Idempotency-Key': idempotency_key}
+        try:
+            for attempt in range(self.config.WRITE_RETRIES + 1):
+                if attempt:
+                    time.sleep(self.config.WRITE_RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+                response_data, error_message = self._make_request(endpoint, 'POST', data, headers=headers)
+                if error_message is None or not self._is_retryable_error(error_message):
+                    break
+        except BaseException:
+            self._idempotency.finish(idempotency_key, idempotency.UNCERTAIN)
+            raise
+
+        if error_message is None:
+            self._idempotency.finish(idempotency_key, idempotency.DONE, response_data)
+            return response_data, None
+
+        if self._created_nothing(error_message):
+            self._idempotency.release(idempotency_key)
+        else:
+            self._idempotency.finish(idempotency_key, idempotency.UNCERTAIN)
+        return None, error_message
+
+    def create_rental(self, rental: Dict, idempotency_key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Create a rental (CreateRentalRequest: inventory_id, customer_id, staff_id).
+        
+        Args:
+            rental: Rental request data
+            idempotency_key: Key that makes retries of this rental safe
+            
+        Returns:
+            Tuple of (rental_data, error_message)
+        """
+        response_data, error_message = self._submit_idempotent('/v1/rentals', rental, idempotency_key)
+        if error_message is None:
+            self.invalidate_dataset('rentals')
+        return response_data, error_message
+
+    def create_customer(self, customer: Dict, idempotency_key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Create a customer (CreateCustomerRequest, including the nested address).
+        
+        Args:
+            customer: Customer request data
+            idempotency_key: Key that makes retries of this customer safe
+            
+        Returns:
+            Tuple of (customer_data, error_message)
+        """
+        response_data, error_message = self._submit_idempotent('/v1/customers', customer, idempotency_key)
+        if error_message is None:
+            self.invalidate_dataset('customers')
+        return response_data, error_message
+
+    def _bulk_submit(self, endpoint: str, dataset_name: str, items: List[Dict], batch_key: str) -> List[Dict]:
+        """
+        Submit many items concurrently with bounded parallelism.
+
+        The affected dataset is invalidated once, after the batch, if anything was created.
+
+        Returns:
+            One result per item, in input order, with keys index, item,
+            idempotency_key, ok, data and error
+        """
+        def submit(index_item):
+            index, item = index_item
+            key = self.make_idempotency_key(batch_key, index, item)
+            response_data, error_message = self._submit_idempotent(endpoint, item, key)
+            return {
+                'index': index,
+                'item': item,
+                'idempotency_key': key,
+                'ok': error_message is None,
+                'data': response_data,
+                'error': error_message,
+            }
+
+        if not items:
+            return []
+
+        max_workers = max(1, min(self.config.BULK_MAX_PARALLEL, len(items)))
+        with futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api-bulk') as executor:
+            results = list(executor.map(submit, enumerate(items)))
+
+        succeeded = sum(1 for result in results if result['ok'])
+        logger.info("Bulk submit to %s: %d of %d succeeded", endpoint, succeeded, len(results))
+        if succeeded:
+            self.invalidate_dataset(dataset_name)
+
+        return results
+
+    def bulk_create_rentals(self, rentals: List[Dict], batch_key: str) -> List[Dict]:
+        """
+        Create many rentals at once; see _bulk_submit for the per-item results.
+        
+        Args:
+            rentals: CreateRentalRequest payloads
+            batch_key: Identifies the batch so resubmitting it is idempotent
+        """
+        return self._bulk_submit('/v1/rentals', 'rentals', rentals, batch_key)
+
+    def bulk_create_customers(self, customers: List[Dict], batch_key: str) -> List[Dict]:
+        """
+        Create many customers at once; see _bulk_submit for the per-item results.
+        
+        Args:
+            customers: CreateCustomerRequest payloads
+            batch_key: Identifies the batch so resubmitting it is idempotent
+        """
+        return self._bulk_submit('/v1/customers', 'customers', customers, batch_key)
 
     def health_check(self) -> Tuple[bool, Optional[str]]:
         """
         Check if the API server is healthy.
+
+        Probes every replica, ejecting the ones that fail and restoring the ones
+        that recovered.
         
         Returns:
             Tuple of (is_healthy, error_message)
         """
-        response_data, error_message = self._make_request('/health')
+        limiter = self._get_limiter(endpoint_group('/health'))
+        if not limiter.acquire():
+            return False, SERVICE_BUSY_MESSAGE
 
-        if response_data is not None:
+        is_healthy = False
+        error_message = None
+        try:
+            for backend in self.backends.backends:
+                self.backends.claim(backend)
+                response_data, probe_error = self._send_request('/health', backend=backend)
+                self.backends.report_health(backend, response_data is not None)
+
+                if response_data is not None:
+                    is_healthy = True
+                else:
+                    error_message = probe_error
+        finally:
+            limiter.release()
+
+        if is_healthy:
             return True, None
-        else:
-            return False, error_message
+        return False, error_message
+
+
+_api_service: Optional[APIService] = None
+_api_service_lock = threading.Lock()
+
+
+def get_api_service() -> APIService:
+    """
+    Get the process-wide APIService, building it on first use.
+
+    SimpleLazyObject takes no lock, so a burst of first requests on a threaded
+    worker could otherwise build several services, each with its own limiters.
+    """
+    global _api_service
+    if _api_service is None:
+        with _api_service_lock:
+            if _api_service is None:
+                _api_service = APIService()
+    return _api_service
 
 
-# Global instance for use in views
-api_service = APIService()
+# Global instance for use in views, built on first use rather than at import
+api_service = SimpleLazyObject(get_api_service)
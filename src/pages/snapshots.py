@@ -0,0 +1,193 @@
+"""
+Versioned snapshots of the list datasets in a SQLite file shared by every worker on a host.
+
+One worker at a time holds the writer lease and saves each list it fetches; all
+workers read from the file, to share fresh lists and, during backend outages, to
+serve the last-known-good copy.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    invalidated INTEGER NOT NULL DEFAULT 0,
+    payload BLOB NOT NULL,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS writer_lease (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SnapshotMeta:
+    """Version and freshness of a stored snapshot, without its payload."""
+
+    def __init__(self, version: int, fetched_at: float, invalidated: bool):
+        self.version = version
+        self.fetched_at = fetched_at
+        self.invalidated = invalidated
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class SnapshotStore:
+    """
+    SQLite-backed snapshot store; safe to use from many threads and processes.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # The file is per host, so the process ID identifies the writer
+        self.owner = str(os.getpid())
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # WAL lets readers in other workers proceed while the writer saves
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if not self._schema_ready:
+                connection.executescript(SCHEMA)
+                self._add_updated_at(connection)
+                self._schema_ready = True
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _add_updated_at(connection: sqlite3.Connection):
+        # Files written before updated_at existed
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(snapshots)')}
+        if 'updated_at' not in columns:
+            try:
+                connection.execute('ALTER TABLE snapshots ADD COLUMN updated_at REAL NOT NULL DEFAULT 0')
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+
+    def read_meta(self, name: str) -> Optional[SnapshotMeta]:
+        """Get a snapshot's version and age, or None if there is none (or the store is unusable)."""
+        try:
+            row = self._connect().execute(
+                'SELECT version, fetched_at, invalidated FROM snapshots WHERE name = ?', (name,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Could not read snapshot metadata for %s: %s", name, e)
+            return None
+
+        return SnapshotMeta(row[0], row[1], bool(row[2])) if row else None
+
+    def read(self, name: str) -> Optional[Tuple[List[Dict[str, Any]], SnapshotMeta]]:
+        """
+        Load a snapshot.
+
+        Returns:
+            Tuple of (items, meta), or None if there is no usable snapshot
+        """
+        try:
+            row = self._connect().execute(
+                'SELECT version, fetched_at, invalidated, payload FROM snapshots WHERE name = ?', (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            return json.loads(row[3]), SnapshotMeta(row[0], row[1], bool(row[2]))
+        except (sqlite3.Error, ValueError) as e:
+            logger.error("Could not read snapshot %s: %s", name, e)
+            return None
+
+    def write(self, name: str, items: List[Dict[str, Any]], fetched_at: float,
+              updated_at: Optional[float] = None) -> bool:
+        """
+        Save a new snapshot version if this process holds (or can take) the writer lease.
+
+        Args:
+            name: Dataset name
+            items: The full list
+            fetched_at: When the list was fetched (its age for the TTL)
+            updated_at: When the items were last brought up to date, if after
+                fetched_at (a list patched with changed entities)
+
+        Returns:
+            True if the snapshot was written
+        """
+        payload = json.dumps(items, separators=(',', ':')).encode()
+        try:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                if not self._hold_lease(connection):
+                    connection.execute('ROLLBACK')
+                    return False
+
+                connection.execute(
+                    """
+                    INSERT INTO snapshots (name, version, fetched_at, invalidated, payload, updated_at)
+                    VALUES (?, 1, ?, 0, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        version = version + 1,
+                        fetched_at = excluded.fetched_at,
+                        invalidated = 0,
+                        payload = excluded.payload,
+                        updated_at = excluded.updated_at
+                    """,
+                    (name, fetched_at, payload, updated_at or fetched_at)
+                )
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            logger.error("Could not write snapshot %s: %s", name, e)
+            return False
+
+        logger.info("Saved %s snapshot (%d items, %d bytes)", name, len(items), len(payload))
+        return True
+
+    def mark_invalidated(self, name: str, changed_at: Optional[float] = None):
+        """
+        Flag a snapshot as outdated so it is only used as a last resort.
+
+        Args:
+            name: Dataset name
+            changed_at: When the upstream change was reported; a snapshot brought
+                up to date since then already has it and is left alone
+        """
+        try:
+            if changed_at is None:
+                self._connect().execute('UPDATE snapshots SET invalidated = 1 WHERE name = ?', (name,))
+            else:
+                self._connect().execute(
+                    'UPDATE snapshots SET invalidated = 1 WHERE name = ? AND updated_at < ?', (name, changed_at)
+                )
+        except sqlite3.Error as e:
+            logger.error("Could not invalidate snapshot %s: %s", name, e)
+
+    def _hold_lease(self, connection: sqlite3.Connection) -> bool:
+        # Runs inside the write transaction, so lease checks can't race
+        now = time.time()
+        row = connection.execute('SELECT owner, expires_at FROM writer_lease WHERE id = 1').fetchone()
+        if row is not None and row[0] != self.owner and row[1] > now:
+            return False
+
+        connection.execute(
+            'INSERT OR REPLACE INTO writer_lease (id, owner, expires_at) VALUES (1, ?, ?)',
+            (self.owner, now + self.lease_seconds)
+        )
+        return True
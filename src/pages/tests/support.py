@@ -0,0 +1,42 @@
+"""
+Helpers shared by the pages test modules.
+"""
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+
+from ..services import APIConfig, APIService
+
+
+def make_service(test, **config) -> APIService:
+    """
+    Build an APIService with its own snapshot file and invalidation log.
+
+    Args:
+        test: The running TestCase, which cleans the files up afterwards
+        config: APIConfig attributes to override
+    """
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+
+    log_settings = override_settings(API_INVALIDATION_LOG=os.path.join(directory.name, 'invalidations.sqlite3'))
+    log_settings.enable()
+    test.addCleanup(log_settings.disable)
+
+    attributes = {
+        'BASE_URL': 'http://api.test',
+        'SNAPSHOT_PATH': os.path.join(directory.name, 'snapshots.sqlite3'),
+        **config,
+    }
+    return APIService(type('TestConfig', (APIConfig,), attributes)())
+
+
+def fake_response(status_code: int = 200, body=None) -> mock.Mock:
+    """A requests.Response stand-in with a JSON body."""
+    content = json.dumps(body).encode() if body is not None else b''
+    response = mock.Mock(status_code=status_code, content=content)
+    response.json.return_value = body
+    return response
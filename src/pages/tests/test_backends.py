@@ -0,0 +1,88 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from up import views as up_views
+from ..resilience import BackendPool
+from .support import fake_response, make_service
+
+
+class BackendPoolTests(SimpleTestCase):
+
+    def test_prefers_least_outstanding(self):
+        pool = BackendPool(['http://a', 'http://b'])
+
+        first = pool.choose()
+        second = pool.choose()
+
+        self.assertNotEqual(first.url, second.url)
+
+    def test_ejects_after_consecutive_failures(self):
+        pool = BackendPool(['http://a', 'http://b'], eject_after_failures=2, eject_duration=60)
+        bad = pool.backends[0]
+
+        for _ in range(2):
+            pool.claim(bad)
+            pool.release(bad, success=False)
+
+        self.assertFalse(pool.stats()[0]['healthy'])
+        self.assertEqual({pool.choose().url for _ in range(3)}, {'http://b'})
+
+    def test_fails_open_when_everything_is_ejected(self):
+        pool = BackendPool(['http://a'], eject_after_failures=1, eject_duration=60)
+        backend = pool.choose()
+        pool.release(backend, success=False)
+
+        self.assertEqual(pool.choose().url, 'http://a')
+
+    def test_health_probe_restores_replica(self):
+        pool = BackendPool(['http://a', 'http://b'])
+        pool.report_health(pool.backends[0], healthy=False)
+        self.assertFalse(pool.stats()[0]['healthy'])
+
+        pool.report_health(pool.backends[0], healthy=True)
+        self.assertTrue(pool.stats()[0]['healthy'])
+
+    def test_needs_a_url(self):
+        with self.assertRaises(ValueError):
+            BackendPool([])
+
+
+class ReplicaConfigTests(SimpleTestCase):
+
+    def test_replicas_default_to_base_url(self):
+        service = make_service(self, BASE_URL='http://other.test:9000')
+
+        self.assertEqual(service.backends.urls, ['http://other.test:9000'])
+
+    def test_explicit_replicas(self):
+        service = make_service(self, BASE_URLS=['http://a.test', 'http://b.test'])
+
+        self.assertEqual(service.backends.urls, ['http://a.test', 'http://b.test'])
+
+    def test_requests_avoid_a_failing_replica(self):
+        service = make_service(self, BASE_URLS=['http://a.test', 'http://b.test'], EJECT_AFTER_FAILURES=1,
+                               HEDGE_REQUESTS=False)
+
+        def get(url, **kwargs):
+            if url.startswith('http://a.test'):
+                raise requests.exceptions.ReadTimeout()
+            return fake_response(200, [])
+
+        with mock.patch('requests.get', side_effect=get) as patched_get:
+            for _ in range(4):
+                service._make_request('/v1/films')
+
+        urls = [call.args[0] for call in patched_get.call_args_list]
+        self.assertEqual(sum(url.startswith('http://a.test') for url in urls), 1)
+
+    def test_health_json_lists_every_replica(self):
+        service = make_service(self, BASE_URLS=['http://a.test', 'http://b.test'])
+
+        with mock.patch.object(up_views, 'api_service', service), \
+                mock.patch('requests.get', return_value=fake_response(200, {'status': 'ok'})):
+            body = self.client.get('/up/health/').json()
+
+        self.assertEqual(body['api_url'], 'http://a.test')
+        self.assertEqual(body['api_urls'], ['http://a.test', 'http://b.test'])
@@ -0,0 +1,138 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from .. import idempotency, views
+from ..services import APIService, SERVICE_BUSY_MESSAGE, UNCERTAIN_WRITE_MESSAGE
+from ..utils import parse_customer_lines, parse_rental_lines
+from .support import fake_response, make_service
+
+
+class BulkParserTests(SimpleTestCase):
+
+    def test_parse_rental_lines(self):
+        rentals, errors = parse_rental_lines("1,2\n\n3, 4, 9\n5\nx,1\n-1,2", staff_id=1)
+
+        self.assertEqual(rentals, [
+            {'inventory_id': 1, 'customer_id': 2, 'staff_id': 1},
+            {'inventory_id': 3, 'customer_id': 4, 'staff_id': 9},
+        ])
+        self.assertEqual([error.split(':')[0] for error in errors], ['Line 4', 'Line 5', 'Line 6'])
+
+    def test_parse_customer_lines(self):
+        customers, errors = parse_customer_lines(
+            "Ann,Lee,ann@example.com,1,1 Main St,North,Springfield,12345,5551234567\n"
+            "Bob,Ray,bob@example.com,one,2 Main St,North,Springfield,12345,5551234567\n"
+            "too,few"
+        )
+
+        self.assertEqual(len(customers), 1)
+        self.assertEqual(customers[0]['store_id'], 1)
+        self.assertEqual(customers[0]['address']['city_name'], 'Springfield')
+        self.assertEqual(len(errors), 2)
+
+
+class IdempotentSubmitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self, WRITE_RETRIES=2, WRITE_RETRY_BACKOFF=0)
+        # A second worker process on the same host shares the idempotency store
+        self.sibling = make_service(self, WRITE_RETRIES=2, WRITE_RETRY_BACKOFF=0,
+                                    SNAPSHOT_PATH=self.service.config.SNAPSHOT_PATH)
+
+    @staticmethod
+    def refused():
+        reason = NewConnectionError(None, 'Connection refused')
+        return requests.exceptions.ConnectionError(MaxRetryError(None, '/v1/rentals', reason))
+
+    def submit(self, service, key, **post):
+        with mock.patch('requests.post', **post) as patched:
+            result = service._submit_idempotent('/v1/rentals', {'customer_id': 1}, key)
+        return result, patched.call_count
+
+    def test_retries_refused_connections_with_the_same_key(self):
+        with mock.patch('requests.post', side_effect=[self.refused(), fake_response(201, {'id': 1})]) as post:
+            data, error_message = self.service._submit_idempotent('/v1/rentals', {'customer_id': 1}, 'key-1')
+
+        self.assertEqual((data, error_message), ({'id': 1}, None))
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual({call.kwargs['headers']['Idempotency-Key'] for call in post.call_args_list}, {'key-1'})
+
+    def test_sibling_worker_replays_the_result(self):
+        self.submit(self.service, 'key-2', return_value=fake_response(201, {'id': 2}))
+
+        (data, error_message), calls = self.submit(self.sibling, 'key-2', return_value=fake_response(201, {'id': 9}))
+
+        self.assertEqual((data, error_message), ({'id': 2}, None))
+        self.assertEqual(calls, 0)
+
+    def test_sibling_worker_rejects_a_key_in_flight(self):
+        self.assertEqual(self.service._idempotency.claim('key-3'), (idempotency.CLAIMED, None))
+
+        (data, error_message), calls = self.submit(self.sibling, 'key-3', return_value=fake_response(201, {}))
+
+        self.assertIsNone(data)
+        self.assertFalse(self.service.is_busy_error(error_message))
+        self.assertEqual(calls, 0)
+
+    def test_timeout_is_neither_retried_nor_resent(self):
+        (data, error_message), calls = self.submit(self.service, 'key-4', side_effect=requests.exceptions.ReadTimeout())
+        self.assertIn("timed out", error_message)
+        self.assertEqual(calls, 1)
+
+        (data, error_message), calls = self.submit(self.sibling, 'key-4', return_value=fake_response(201, {}))
+        self.assertEqual(error_message, UNCERTAIN_WRITE_MESSAGE)
+        self.assertEqual(calls, 0)
+
+    def test_unsent_and_rejected_writes_can_be_resubmitted(self):
+        self.submit(self.service, 'key-5', side_effect=self.refused())
+        self.submit(self.service, 'key-6', return_value=fake_response(422, {}))
+
+        for key in ('key-5', 'key-6'):
+            (data, error_message), calls = self.submit(self.sibling, key, return_value=fake_response(201, {'id': 7}))
+            self.assertEqual((data, error_message, calls), ({'id': 7}, None, 1))
+
+    def test_expired_keys_are_forgotten(self):
+        self.service._idempotency.ttl = -1
+        self.submit(self.service, 'key-7', return_value=fake_response(201, {'id': 1}))
+
+        _, calls = self.submit(self.sibling, 'key-7', return_value=fake_response(201, {'id': 1}))
+
+        self.assertEqual(calls, 1)
+
+    def test_load_shed_is_retryable(self):
+        self.assertTrue(APIService._is_retryable_error(SERVICE_BUSY_MESSAGE))
+        self.assertFalse(APIService._is_retryable_error("API returned status code: 500"))
+
+
+class BulkCheckoutViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self, WRITE_RETRY_BACKOFF=0)
+        patcher = mock.patch.object(views, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, **post):
+        data = {'batch_key': 'batch-1', 'staff_id': '1', 'lines': '1,2\n3,4'}
+        with mock.patch('requests.post', **post) as patched:
+            response = self.client.post('/rentals/checkout/', data)
+        return response, patched.call_count
+
+    def test_resubmitting_a_batch_only_sends_failed_lines(self):
+        response, calls = self.post(side_effect=[fake_response(201, {'id': 1}), fake_response(422, {})])
+        self.assertEqual(calls, 2)
+        self.assertEqual((response.context['succeeded'], response.context['failed']), (1, 1))
+
+        response, calls = self.post(return_value=fake_response(201, {'id': 2}))
+        self.assertEqual(calls, 1)
+        self.assertEqual(response.context['succeeded'], 2)
+
+    def test_invalid_lines_send_nothing(self):
+        with mock.patch('requests.post') as post:
+            response = self.client.post('/rentals/checkout/', {'batch_key': 'b', 'staff_id': '1', 'lines': 'x'})
+
+        self.assertTrue(response.context['errors'])
+        post.assert_not_called()
@@ -0,0 +1,101 @@
+import threading
+import time
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from up import views as up_views
+from ..resilience import ConcurrencyLimiter
+from ..services import SERVICE_BUSY_MESSAGE
+from .support import fake_response, make_service
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+
+    def test_sheds_when_queue_is_full(self):
+        limiter = ConcurrencyLimiter('films', max_concurrent=2, max_queued=0, queue_timeout=1)
+
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.stats()['shed'], 1)
+
+        limiter.release()
+        self.assertTrue(limiter.acquire())
+
+    def test_sheds_after_queue_timeout(self):
+        limiter = ConcurrencyLimiter('films', max_concurrent=1, max_queued=1, queue_timeout=0.05)
+        limiter.acquire()
+
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.stats()['waiting'], 0)
+
+    def test_queued_caller_gets_released_slot(self):
+        limiter = ConcurrencyLimiter('films', max_concurrent=1, max_queued=1, queue_timeout=5)
+        limiter.acquire()
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+        waiter.start()
+
+        time.sleep(0.05)
+        limiter.release()
+        waiter.join()
+
+        self.assertEqual(results, [True])
+        self.assertEqual(limiter.stats()['in_flight'], 1)
+
+    def test_try_acquire_never_queues(self):
+        limiter = ConcurrencyLimiter('films', max_concurrent=1, max_queued=5, queue_timeout=5)
+
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        self.assertEqual(limiter.stats()['shed'], 0)
+
+
+class ServiceLimitTests(SimpleTestCase):
+
+    def test_sheds_requests_beyond_the_group_limit(self):
+        service = make_service(self, CONCURRENCY_LIMITS={'films': (1, 0), 'default': (8, 16)}, HEDGE_REQUESTS=False)
+        limiter = service._get_limiter('films')
+        limiter.acquire()
+
+        with mock.patch('requests.get') as get:
+            data, error_message = service._make_request('/v1/films')
+
+        self.assertIsNone(data)
+        self.assertEqual(error_message, SERVICE_BUSY_MESSAGE)
+        get.assert_not_called()
+
+
+class HealthEndpointTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self, BASE_URLS=['http://a.test', 'http://b.test'])
+        patcher = mock.patch.object(up_views, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reports_metrics_and_ejects_failed_replicas(self):
+        def get(url, **kwargs):
+            if url.startswith('http://b.test'):
+                raise requests.exceptions.ReadTimeout()
+            return fake_response(200, {'status': 'ok'})
+
+        with mock.patch('requests.get', side_effect=get):
+            response = self.client.get('/up/health/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ok')
+        self.assertEqual([backend['healthy'] for backend in body['backends']], [True, False])
+        self.assertIn('health', body['concurrency'])
+        self.assertIn('shed', body['concurrency']['health'])
+        self.assertIn('endpoints', body['latency'])
+
+    def test_unhealthy_when_every_replica_fails(self):
+        with mock.patch('requests.get', side_effect=requests.exceptions.ReadTimeout()):
+            response = self.client.get('/up/health/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'error')
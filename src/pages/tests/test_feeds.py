@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .. import feeds
+from ..feeds import RentalsFeed, diff_rentals
+from ..rows import rental_key, rental_row_key
+from .support import fake_response, make_service
+
+ALICE = {'first_name': 'Alice', 'last_name': 'Ames', 'title': 'ACADEMY DINOSAUR', 'rental_date': '2024-01-02T10:00:00Z'}
+BOB = {'first_name': 'Bob', 'last_name': 'Bell', 'title': 'ACE GOLDFINGER', 'rental_date': '2024-01-03T11:00:00Z'}
+
+
+def keyed(*rentals):
+    return {rental_key(rental): rental for rental in rentals}
+
+
+class DiffRentalsTests(SimpleTestCase):
+
+    def test_new_changed_and_removed(self):
+        returned = dict(BOB, title='AIRPORT POLLOCK')
+
+        changed, removed = diff_rentals(keyed(ALICE, BOB), keyed(dict(ALICE, phone='555'), returned))
+
+        self.assertEqual(changed, [dict(ALICE, phone='555'), returned])
+        self.assertEqual(removed, [BOB])
+
+    def test_no_changes(self):
+        self.assertEqual(diff_rentals(keyed(ALICE), keyed(ALICE)), ([], []))
+
+
+class RentalsFeedPollTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+        patcher = mock.patch.object(feeds, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Every poll refetches
+        self.feed = RentalsFeed(poll_interval=0)
+
+    def poll(self, rentals):
+        with mock.patch('requests.get', return_value=fake_response(200, rentals)):
+            return self.feed._poll()
+
+    @staticmethod
+    def payload(message):
+        event, data = message.strip().split('\n')
+        assert event == 'event: rentals'
+        return json.loads(data[len('data: '):])
+
+    def test_first_poll_is_diffed_against_the_rendered_page(self):
+        # The page was rendered from this copy before the feed started polling
+        self.service._datasets.put('rentals', [ALICE], fetched_at=time.time() - 10)
+
+        payload = self.payload(self.poll([ALICE, BOB]))
+
+        self.assertEqual((payload['changed'], payload['removed'], payload['total']), (1, 0, 2))
+        self.assertIn('ACE GOLDFINGER', payload['html'])
+        self.assertNotIn('ACADEMY DINOSAUR', payload['html'])
+
+    def test_first_poll_without_a_cached_copy_sets_the_baseline(self):
+        self.assertIsNone(self.poll([ALICE]))
+        self.assertIsNone(self.poll([ALICE]))
+
+        payload = self.payload(self.poll([BOB]))
+
+        self.assertEqual((payload['changed'], payload['removed']), (1, 1))
+        self.assertEqual(payload['removed_keys'], [rental_row_key(ALICE)])
+
+    def test_api_errors_push_nothing(self):
+        self.poll([ALICE])
+
+        with mock.patch('requests.get', return_value=fake_response(500)):
+            self.assertIsNone(self.feed._poll())
+
+
+class RentalsFeedSubscriberTests(SimpleTestCase):
+
+    def test_poller_runs_while_someone_listens(self):
+        feed = RentalsFeed(poll_interval=60)
+
+        async def scenario():
+            with mock.patch.object(feed, '_poll', return_value='event: rentals\ndata: {}\n\n'):
+                queue = feed.subscribe()
+                message = await asyncio.wait_for(queue.get(), timeout=1)
+                running = feed._task is not None
+                feed.unsubscribe(queue)
+            return message, running
+
+        message, running = asyncio.run(scenario())
+
+        self.assertTrue(message.startswith('event: rentals'))
+        self.assertTrue(running)
+        self.assertIsNone(feed._task)
+        self.assertEqual(feed.subscriber_count, 0)
+
+    def test_slow_subscriber_is_dropped(self):
+        feed = RentalsFeed(queue_size=2)
+
+        async def scenario():
+            queue = asyncio.Queue(maxsize=2)
+            feed._subscribers.add(queue)
+            for number in range(3):
+                feed._broadcast(f'message {number}')
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        self.assertEqual(asyncio.run(scenario()), ['message 1', None])
+        self.assertEqual(feed.subscriber_count, 0)
+
+
+class RentalsStreamViewTests(SimpleTestCase):
+
+    def test_wsgi_requests_get_503(self):
+        response = self.client.get(reverse('rentals_stream'))
+
+        self.assertEqual(response.status_code, 503)
@@ -0,0 +1,130 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..resilience import endpoint_key
+from .support import make_service
+
+
+class EndpointKeyTests(SimpleTestCase):
+
+    def test_normalizes_ids_and_query(self):
+        self.assertEqual(endpoint_key('/v1/films/42'), 'GET /v1/films/{id}')
+        self.assertEqual(endpoint_key('/v1/films/search?q=alien'), 'GET /v1/films/search')
+
+    def test_separates_methods(self):
+        self.assertNotEqual(endpoint_key('/v1/rentals', 'POST'), endpoint_key('/v1/rentals'))
+
+
+class AdaptiveTimeoutTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self, DEFAULT_TIMEOUT=10, MIN_TIMEOUT=1, ADAPTIVE_TIMEOUT_MULTIPLIER=3,
+                                    LATENCY_MIN_SAMPLES=5)
+
+    def record(self, key, seconds, count=10):
+        for _ in range(count):
+            self.service._latency.record(key, seconds)
+
+    def test_default_until_enough_samples(self):
+        self.record('GET /v1/films', 0.5, count=4)
+
+        self.assertEqual(self.service._get_timeout('GET /v1/films'), 10)
+
+    def test_follows_p99_within_bounds(self):
+        self.record('GET /v1/films', 0.5)
+        self.record('GET /v1/customers', 0.1)
+        self.record('GET /v1/rentals', 5)
+
+        self.assertEqual(self.service._get_timeout('GET /v1/films'), 1.5)
+        self.assertEqual(self.service._get_timeout('GET /v1/customers'), 1)
+        self.assertEqual(self.service._get_timeout('GET /v1/rentals'), 10)
+
+    def test_reads_and_writes_have_separate_timeouts(self):
+        self.record('GET /v1/rentals', 0.5)
+
+        self.assertEqual(self.service._get_timeout('POST /v1/rentals'), 10)
+
+
+class HedgingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self, HEDGE_MIN_DELAY=0.01)
+        for _ in range(30):
+            self.service._latency.record(endpoint_key('/v1/films/1'), 0.05)
+
+    def send(self, delays):
+        """Patch _send_request so the nth attempt takes delays[n] seconds."""
+        attempts = []
+        lock = threading.Lock()
+
+        def send_request(endpoint, method='GET', data=None, backend=None, headers=None):
+            with lock:
+                attempt = len(attempts)
+                attempts.append(backend)
+            time.sleep(delays[attempt])
+            return {'attempt': attempt}, None
+
+        return mock.patch.object(self.service, '_send_request', side_effect=send_request), attempts
+
+    def films_limiter(self):
+        return self.service._get_limiter('films')
+
+    def test_fast_request_is_not_hedged(self):
+        patcher, attempts = self.send([0.0])
+        with patcher:
+            data, _ = self.service._make_request('/v1/films/1', hedge=True)
+
+        self.assertEqual(data, {'attempt': 0})
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual(self.service._hedges_sent, 0)
+
+    def test_slow_request_is_hedged_and_keeps_its_slot(self):
+        patcher, attempts = self.send([0.5, 0.0])
+        with patcher:
+            data, _ = self.service._make_request('/v1/films/1', hedge=True)
+
+            self.assertEqual(data, {'attempt': 1})
+            self.assertEqual(self.service._hedges_won, 1)
+            # The slow primary is still running upstream and still holds its slot
+            self.assertEqual(self.films_limiter().stats()['in_flight'], 1)
+
+            time.sleep(0.6)
+            self.assertEqual(self.films_limiter().stats()['in_flight'], 0)
+
+    def test_no_hedge_without_a_free_slot(self):
+        limiter = self.films_limiter()
+        for _ in range(limiter.max_concurrent - 1):
+            limiter.acquire()
+
+        patcher, attempts = self.send([0.2, 0.0])
+        with patcher:
+            data, _ = self.service._make_request('/v1/films/1', hedge=True)
+
+        self.assertEqual(data, {'attempt': 0})
+        self.assertEqual(self.service._hedges_sent, 0)
+
+    def test_concurrent_lookups_do_not_queue_for_threads(self):
+        for _ in range(30):
+            self.service._latency.record(endpoint_key('/v1/customers/1'), 0.3)
+            self.service._latency.record(endpoint_key('/v1/films/1'), 0.3)
+
+        def send_request(endpoint, method='GET', data=None, backend=None, headers=None):
+            time.sleep(0.1)
+            return {}, None
+
+        lookups = [threading.Thread(target=self.service._make_request, args=(f'/v1/{name}/{i}',),
+                                    kwargs={'hedge': True})
+                   for i in range(8) for name in ('films', 'customers')]
+        start = time.monotonic()
+        with mock.patch.object(self.service, '_send_request', side_effect=send_request):
+            for lookup in lookups:
+                lookup.start()
+            for lookup in lookups:
+                lookup.join()
+
+        # One round of 100 ms, not two rounds through a too-small pool
+        self.assertLess(time.monotonic() - start, 0.18)
+        self.assertEqual(self.service._hedges_sent, 0)
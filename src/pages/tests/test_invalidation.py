@@ -0,0 +1,170 @@
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .. import invalidation, views
+from .support import fake_response, make_service
+
+
+class WebhookSigningTests(SimpleTestCase):
+
+    def test_valid_signature(self):
+        timestamp = str(int(time.time()))
+        signature = invalidation.sign_payload(b'{}', timestamp, 'secret')
+
+        self.assertTrue(invalidation.verify_signature(b'{}', timestamp, signature, 'secret'))
+
+    def test_rejects_tampering_and_wrong_secret(self):
+        timestamp = str(int(time.time()))
+        signature = invalidation.sign_payload(b'{}', timestamp, 'secret')
+
+        self.assertFalse(invalidation.verify_signature(b'{"x":1}', timestamp, signature, 'secret'))
+        self.assertFalse(invalidation.verify_signature(b'{}', timestamp, signature, 'other'))
+
+    def test_rejects_stale_timestamps(self):
+        timestamp = str(int(time.time()) - 3600)
+        signature = invalidation.sign_payload(b'{}', timestamp, 'secret')
+
+        self.assertFalse(invalidation.verify_signature(b'{}', timestamp, signature, 'secret'))
+
+    def test_empty_secret_disables_webhook(self):
+        timestamp = str(int(time.time()))
+        signature = invalidation.sign_payload(b'{}', timestamp, '')
+
+        self.assertFalse(invalidation.verify_signature(b'{}', timestamp, signature, ''))
+
+    def test_parse_events(self):
+        events = invalidation.parse_events({'events': [{'type': 'customer', 'ids': ['7', 5, 7]}, {'type': 'film'}]})
+
+        self.assertEqual(events, [{'type': 'customer', 'ids': [5, 7]}, {'type': 'film', 'ids': []}])
+        self.assertIsNone(invalidation.parse_events({'events': [{'type': 'store'}]}))
+        self.assertIsNone(invalidation.parse_events({'events': [{'type': 'film', 'ids': ['x']}]}))
+
+
+class InvalidationLogTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        log_settings = override_settings(API_INVALIDATION_LOG=os.path.join(directory.name, 'log.sqlite3'))
+        log_settings.enable()
+        self.addCleanup(log_settings.disable)
+
+    def test_feed_reads_batches_published_after_its_first_poll(self):
+        invalidation.publish([{'type': 'film', 'ids': [1]}])
+        feed = invalidation.InvalidationFeed()
+        self.assertEqual(feed.poll(force=True), [])
+
+        first = invalidation.publish([{'type': 'customer', 'ids': [2]}])
+        second = invalidation.publish([{'type': 'rental', 'ids': []}])
+
+        self.assertEqual(second, first + 1)
+        events = feed.poll(force=True)
+        self.assertEqual([(event['type'], event['ids']) for event in events], [('customer', [2]), ('rental', [])])
+        self.assertTrue(all(event['published_at'] <= time.time() for event in events))
+        self.assertEqual(feed.poll(force=True), [])
+
+    def test_feed_drops_everything_when_batches_expired(self):
+        feed = invalidation.InvalidationFeed()
+        feed.poll(force=True)
+        with mock.patch.object(invalidation, 'EVENT_TTL', -1):
+            invalidation.publish([{'type': 'film', 'ids': [1]}])
+            invalidation.publish([{'type': 'film', 'ids': [2]}])
+
+        self.assertEqual(feed.poll(force=True), invalidation.InvalidationFeed.EVERYTHING)
+
+
+@override_settings(API_INVALIDATION_SECRET='secret')
+class InvalidateWebhookViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+        self.service.sync_invalidations(force=True)
+        patcher = mock.patch.object(views, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, body: bytes, secret: str = 'secret'):
+        timestamp = str(int(time.time()))
+        return self.client.post(
+            reverse('invalidate_webhook'), body, content_type='application/json',
+            HTTP_X_TIMESTAMP=timestamp, HTTP_X_SIGNATURE=invalidation.sign_payload(body, timestamp, secret)
+        )
+
+    def test_rejects_a_bad_signature(self):
+        response = self.post(b'{"events": []}', secret='other')
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(API_INVALIDATION_SECRET='')
+    def test_disabled_without_a_secret(self):
+        response = self.post(b'{"events": []}', secret='')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_rejects_a_malformed_payload(self):
+        for body in (b'not json', b'{"events": [{"type": "store"}]}'):
+            self.assertEqual(self.post(body).status_code, 400)
+
+    def test_accepts_and_applies_events(self):
+        self.service._datasets.put('films', [{'id': 1}])
+
+        response = self.post(json.dumps({'events': [{'type': 'film', 'ids': [1]}]}).encode())
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertIsNone(self.service._datasets.get('films'))
+
+
+class LateInvalidationTests(SimpleTestCase):
+    """A worker that applies an event late must not flag a snapshot a sibling refreshed since."""
+
+    def setUp(self):
+        self.service = make_service(self)
+        self.sibling = make_service(self, SNAPSHOT_PATH=self.service.config.SNAPSHOT_PATH)
+        for service in (self.service, self.sibling):
+            service.sync_invalidations(force=True)
+
+    def fetch(self, service, name, items):
+        with mock.patch('requests.get', return_value=fake_response(200, items)) as get:
+            dataset, error_message = service.get_dataset(name)
+        self.assertIsNone(error_message)
+        return dataset, get.call_count
+
+    def test_snapshot_refetched_after_the_event_is_adopted(self):
+        self.fetch(self.service, 'films', [{'id': 1, 'title': 'Old'}])
+        self.fetch(self.sibling, 'films', [])
+
+        invalidation.publish([{'type': 'film', 'ids': [1]}])
+        self.service.sync_invalidations(force=True)
+        self.fetch(self.service, 'films', [{'id': 1, 'title': 'New'}])
+        self.sibling.sync_invalidations(force=True)
+
+        self.assertFalse(self.service._snapshots.read_meta('films').invalidated)
+        dataset, calls = self.fetch(self.sibling, 'films', [{'id': 1, 'title': 'Other'}])
+        self.assertEqual((dataset.items[0]['title'], calls), ('New', 0))
+
+    def test_snapshot_older_than_the_event_is_flagged(self):
+        self.fetch(self.service, 'films', [{'id': 1, 'title': 'Old'}])
+
+        invalidation.publish([{'type': 'film', 'ids': [1]}])
+        self.sibling.sync_invalidations(force=True)
+
+        self.assertTrue(self.service._snapshots.read_meta('films').invalidated)
+
+    def test_patched_customers_snapshot_is_kept(self):
+        self.fetch(self.service, 'customers', [{'id': 5, 'first_name': 'Old'}])
+
+        invalidation.publish([{'type': 'customer', 'ids': [5]}])
+        with mock.patch('requests.get', return_value=fake_response(200, {'id': 5, 'first_name': 'New'})):
+            self.service.sync_invalidations(force=True)
+        self.sibling.sync_invalidations(force=True)
+
+        self.assertFalse(self.service._snapshots.read_meta('customers').invalidated)
+        dataset, calls = self.fetch(self.sibling, 'customers', [])
+        self.assertEqual((dataset.items[0]['first_name'], calls), ('New', 0))
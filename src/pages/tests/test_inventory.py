@@ -0,0 +1,178 @@
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .. import views
+from ..services import SERVICE_BUSY_MESSAGE
+from ..utils import parse_film_queries, summarize_inventory
+from .support import fake_response, make_service
+
+CATALOG = [
+    {'id': 1, 'title': 'ACADEMY DINOSAUR'},
+    {'id': 2, 'title': 'ACE GOLDFINGER'},
+    {'id': 5, 'title': 'AFRICAN EGG'},
+]
+
+COPIES = {
+    1: [{'inventory_id': 10, 'store_id': 1}, {'inventory_id': 11, 'store_id': 2, 'available': False}],
+    2: [{'inventory_id': 20, 'store_id': 2}],
+    5: [],
+}
+
+
+def fake_api(url, **kwargs):
+    """Answer the films, search and inventory endpoints from the fixtures above."""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    if parts.path == '/v1/films':
+        return fake_response(200, CATALOG)
+    if parts.path == '/v1/films/search':
+        needle = query['q'][0].casefold()
+        return fake_response(200, [film for film in CATALOG if needle in film['title'].casefold()])
+    if parts.path == '/v1/inventory/available':
+        film_id = int(query['film_id'][0])
+        return fake_response(200, COPIES[film_id]) if film_id in COPIES else fake_response(404, {})
+    return fake_response(404, {})
+
+
+class InventoryParsingTests(SimpleTestCase):
+
+    def test_parse_film_queries(self):
+        queries = parse_film_queries("12\nAlien\nalien\n12\n²\n")
+
+        self.assertEqual(queries, [('id', 12), ('title', 'Alien'), ('title', '²')])
+
+    def test_summarize_inventory(self):
+        stores = summarize_inventory([
+            {'inventory_id': 1, 'store_id': 2},
+            {'inventory_id': 2, 'store_id': 1, 'in_stock': False},
+            {'inventory_id': 3, 'store_id': 1},
+            {'inventory_id': 4},
+            {'store_id': 2, 'available': True},
+        ])
+
+        self.assertEqual(stores, [
+            {'store_id': 1, 'available': 1, 'total': 2, 'available_ids': [3]},
+            {'store_id': 2, 'available': 2, 'total': 2, 'available_ids': [1]},
+            {'store_id': None, 'available': 1, 'total': 1, 'available_ids': [4]},
+        ])
+
+
+class ResolveFilmTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+        dataset = self.service._datasets.put('films', CATALOG)
+        self.by_title, self.by_id = dataset.derive('film_index', self.service._build_film_index)
+
+    def resolve(self, query, by_title=None, by_id=None):
+        with mock.patch('requests.get', side_effect=fake_api) as get:
+            result = self.service.resolve_film(
+                query, self.by_title if by_title is None else by_title, self.by_id if by_id is None else by_id
+            )
+        return result, get.call_count
+
+    def test_ids_are_resolved_locally(self):
+        self.assertEqual(self.resolve(('id', 2)), ((2, 'ACE GOLDFINGER', None), 0))
+        self.assertEqual(self.resolve(('id', 3)), ((3, None, "No film found with ID: 3"), 0))
+
+    def test_titles_are_resolved_through_the_catalog(self):
+        self.assertEqual(self.resolve(('title', 'african egg')), ((5, 'AFRICAN EGG', None), 0))
+
+        (film_id, title, error_message), calls = self.resolve(('title', 'Alien'))
+        self.assertEqual((film_id, title, calls), (None, 'Alien', 0))
+        self.assertIn("No film titled", error_message)
+
+    def test_titles_without_a_catalog_are_searched(self):
+        self.assertEqual(self.resolve(('title', 'ace goldfinger'), {}, {}), ((2, 'ACE GOLDFINGER', None), 1))
+
+        (film_id, title, error_message), calls = self.resolve(('title', 'ACE'), {}, {})
+        self.assertIsNone(film_id)
+        self.assertIn("Could not find the ID", error_message)
+
+    def test_catalog_titles_without_ids_are_searched(self):
+        by_title = {'ace goldfinger': {'title': 'ACE GOLDFINGER'}}
+
+        self.assertEqual(self.resolve(('title', 'Ace Goldfinger'), by_title, {}), ((2, 'ACE GOLDFINGER', None), 1))
+
+
+class CheckAvailabilityTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+
+    def check(self, queries, side_effect=fake_api):
+        with mock.patch('requests.get', side_effect=side_effect) as get:
+            return self.service.check_availability(queries), get
+
+    def test_results_follow_the_input_order(self):
+        results, get = self.check([('title', 'ace goldfinger'), ('id', 1), ('id', 5), ('title', 'Alien')])
+
+        self.assertEqual([(r['film_id'], r['title'], r['copies']) for r in results], [
+            (2, 'ACE GOLDFINGER', COPIES[2]),
+            (1, 'ACADEMY DINOSAUR', COPIES[1]),
+            (5, 'AFRICAN EGG', []),
+            (None, 'Alien', []),
+        ])
+        self.assertEqual([r['error'] is None for r in results], [True, True, True, False])
+        self.assertEqual(results[0]['query'], 'ace goldfinger')
+
+    def test_inventories_are_cached(self):
+        self.check([('id', 1)])
+
+        results, get = self.check([('id', 1)])
+
+        self.assertEqual(results[0]['copies'], COPIES[1])
+        self.assertEqual(get.call_count, 0)
+
+    def test_ids_are_checked_without_the_catalog(self):
+        def catalog_down(url, **kwargs):
+            return fake_response(500) if urlsplit(url).path == '/v1/films' else fake_api(url)
+
+        results, get = self.check([('id', 2)], side_effect=catalog_down)
+
+        self.assertEqual((results[0]['copies'], results[0]['error']), (COPIES[2], None))
+
+    def test_no_queries_make_no_requests(self):
+        results, get = self.check([])
+
+        self.assertEqual(results, [])
+        get.assert_not_called()
+
+
+class InventoryViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+        patcher = mock.patch.object(views, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, films):
+        with mock.patch('requests.get', side_effect=fake_api):
+            return self.client.get(reverse('inventory'), {'films': films})
+
+    def test_availability_per_store(self):
+        response = self.get("1\nACE GOLDFINGER")
+
+        self.assertEqual(response.status_code, 200)
+        results = response.context['results']
+        self.assertEqual(response.context['store_ids'], [1, 2])
+        self.assertEqual([result['available'] for result in results], [1, 1])
+        self.assertEqual([[cell and cell['total'] for cell in result['store_cells']] for result in results],
+                         [[1, 1], [None, 1]])
+
+    def test_too_many_films(self):
+        response = self.get("\n".join(str(film_id) for film_id in range(1, views.INVENTORY_MAX_FILMS + 2)))
+
+        self.assertEqual(response.context['results'], [])
+        self.assertIn("At most", response.context['error_message'])
+
+    def test_shed_lookups_answer_503(self):
+        with mock.patch.object(self.service, 'get_film_inventory', return_value=(None, SERVICE_BUSY_MESSAGE)):
+            response = self.get("1")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
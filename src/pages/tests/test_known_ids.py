@@ -0,0 +1,100 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..cache import IdSet
+from .support import fake_response, make_service
+
+
+class IdSetTests(SimpleTestCase):
+
+    def test_dense_ids(self):
+        ids = IdSet([1, 2, 3, 5])
+
+        self.assertIn(5, ids)
+        self.assertNotIn(4, ids)
+        self.assertNotIn(-1, ids)
+        self.assertEqual(len(ids), 4)
+
+    def test_sparse_ids(self):
+        ids = IdSet([1, 10 ** 9])
+
+        self.assertIn(10 ** 9, ids)
+        self.assertNotIn(2, ids)
+
+    def test_might_exist(self):
+        ids = IdSet([1, 2, 5])
+
+        self.assertFalse(ids.might_exist(3))
+        self.assertTrue(ids.might_exist(5))
+        # Above the largest known ID: may have been created since
+        self.assertTrue(ids.might_exist(6))
+
+    def test_rejects_negative_ids(self):
+        with self.assertRaises(ValueError):
+            IdSet([-1])
+
+
+class KnownMissingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+
+    def get_film(self, film_id, status_code=404, body=None):
+        with mock.patch('requests.get', return_value=fake_response(status_code, body)) as get:
+            return self.service.get_film_by_id(film_id), get.call_count
+
+    def test_404_is_remembered(self):
+        self.assertEqual(self.get_film(7), ((None, None), 1))
+
+        self.assertTrue(self.service.is_known_missing('film', 7))
+        self.assertEqual(self.get_film(7, 200, {'id': 7}), ((None, None), 0))
+
+    def test_other_errors_are_not_remembered(self):
+        (film, error_message), calls = self.get_film(7, 500)
+
+        self.assertTrue(error_message)
+        self.assertFalse(self.service.is_known_missing('film', 7))
+
+    def test_404s_expire(self):
+        service = make_service(self, MISSING_ID_TTL=-1)
+        with mock.patch('requests.get', return_value=fake_response(404)):
+            service.get_customer_by_id(7)
+
+        self.assertFalse(service.is_known_missing('customer', 7))
+
+    def test_refetching_the_list_forgets_404s(self):
+        self.get_film(7)
+
+        self.service.invalidate_dataset('films')
+        with mock.patch('requests.get', return_value=fake_response(200, [{'id': 7, 'title': 'NEW'}])):
+            self.service.get_dataset('films')
+
+        self.assertFalse(self.service.is_known_missing('film', 7))
+        self.assertEqual(self.get_film(7, 200, {'id': 7}), (({'id': 7}, None), 1))
+
+    def test_invalidation_events_forget_404s(self):
+        self.get_film(7)
+
+        self.service.apply_invalidations([{'type': 'film', 'ids': [7]}])
+
+        self.assertFalse(self.service.is_known_missing('film', 7))
+
+    def test_gaps_in_a_fresh_list(self):
+        self.service._datasets.put('customers', [{'id': 1}, {'id': 2}, {'id': 5}])
+
+        with mock.patch('requests.get') as get:
+            self.assertTrue(self.service.is_known_missing('customer', 3))
+            self.assertFalse(self.service.is_known_missing('customer', 5))
+            # Above the largest known ID: may have been created since
+            self.assertFalse(self.service.is_known_missing('customer', 6))
+            self.assertEqual(self.service.get_customer_by_id(3), (None, None))
+        get.assert_not_called()
+
+    def test_stale_and_id_less_lists_are_not_trusted(self):
+        self.service._datasets.put('customers', [{'id': 1}, {'id': 5}], fetched_at=time.time() - 3600)
+        self.service._datasets.put('films', [{'title': 'NO ID'}, {'id': 5}])
+
+        self.assertFalse(self.service.is_known_missing('customer', 3))
+        self.assertFalse(self.service.is_known_missing('film', 3))
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .. import views
+from ..cache import DatasetCache
+from ..listing import MAX_FILTER_OPTIONS, TABLE_COLUMNS, ListQuery
+from .support import fake_response, make_service
+
+
+class ListQueryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dataset = DatasetCache(60).put('films', [
+            {'title': 'Zodiac', 'rating': 'R', 'release_year': 2007},
+            {'title': 'alien', 'rating': 'R', 'release_year': 1979},
+            {'title': 'Brave', 'rating': 'PG', 'release_year': None},
+            {'title': 'Cars', 'rating': 'G', 'release_year': 2006},
+        ])
+
+    def query(self, params):
+        query, error_message = ListQuery.from_params('films', QueryDict(params))
+        self.assertIsNone(error_message)
+        return query
+
+    def test_default_order(self):
+        self.assertEqual(list(self.query('').positions(self.dataset)), [0, 1, 2, 3])
+
+    def test_sort_is_case_insensitive(self):
+        self.assertEqual(list(self.query('sort=title').positions(self.dataset)), [1, 2, 3, 0])
+
+    def test_descending_sort_keeps_missing_values_last(self):
+        self.assertEqual(list(self.query('sort=-release_year').positions(self.dataset)), [0, 3, 1, 2])
+
+    def test_filter_and_sort(self):
+        query = self.query('filter=rating:r&sort=release_year')
+
+        self.assertEqual(list(query.positions(self.dataset)), [1, 0])
+
+    def test_filters_intersect(self):
+        query = self.query('filter=rating:R&filter=release_year:2007')
+
+        self.assertEqual(list(query.positions(self.dataset)), [0])
+
+    def test_rejects_unknown_fields(self):
+        for params in ('sort=description', 'filter=title:Alien', 'filter=rating', 'fields=nope'):
+            query, error_message = ListQuery.from_params('films', QueryDict(params))
+            self.assertIsNone(query)
+            self.assertTrue(error_message)
+
+    def test_rentals_offer_only_fields_the_api_sends(self):
+        for params in ('sort=rental_due_date', 'filter=overdue:true', 'fields=overdue'):
+            query, error_message = ListQuery.from_params('rentals', QueryDict(params))
+            self.assertIsNone(query)
+            self.assertTrue(error_message)
+
+    def test_query_string_round_trip(self):
+        query = self.query('sort=-release_year&filter=rating:PG&fields=title,rating')
+
+        self.assertEqual(query.query_string(), 'sort=-release_year&filter=rating%3Apg&fields=title%2Crating')
+        self.assertEqual(self.query(query.query_string()).query_string(), query.query_string())
+        self.assertEqual(query.columns(), [('title', 'Title'), ('rating', 'Rating')])
+        self.assertFalse(query.is_default)
+        self.assertTrue(self.query('').is_default)
+
+    def test_controls(self):
+        controls = self.query('sort=-title&filter=rating:g').controls(self.dataset)
+
+        self.assertIn(('-title', 'Title ↓', True), controls['sort_options'])
+        rating, release_year = controls['filters']
+        self.assertEqual(rating['options'], [('rating:g', 'G', True), ('rating:pg', 'PG', False),
+                                             ('rating:r', 'R', False)])
+        self.assertEqual(release_year['label'], 'Release Year')
+
+    def test_no_dropdown_for_many_values(self):
+        dataset = DatasetCache(60).put('films', [{'rating': str(n)} for n in range(MAX_FILTER_OPTIONS + 1)])
+
+        labels = [control['label'] for control in self.query('').controls(dataset)['filters']]
+
+        self.assertNotIn('Rating', labels)
+
+
+class ListingPageTests(SimpleTestCase):
+
+    RENTALS = [
+        {'first_name': 'Alice', 'last_name': 'Ames', 'phone': '5551234567',
+         'rental_date': '2024-01-02T10:00:00Z', 'title': 'ACE GOLDFINGER'},
+        {'first_name': 'Bob', 'last_name': 'Bell', 'phone': '5559876543',
+         'rental_date': '2024-01-03T10:00:00Z', 'title': 'ACADEMY DINOSAUR'},
+    ]
+
+    def setUp(self):
+        self.service = make_service(self)
+        patcher = mock.patch.object(views, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url_name, params, status_code=200, body=None):
+        with mock.patch('requests.get', return_value=fake_response(status_code, body)):
+            return self.client.get(reverse(url_name), params)
+
+    def test_bad_parameters_are_not_api_errors(self):
+        for url_name, params in (('films', {'sort': 'nope'}),
+                                 ('customers', {'filter': 'email:x'}),
+                                 ('rentals', {'filter': 'overdue:true'})):
+            with self.subTest(url_name=url_name):
+                response = self.get(url_name, params, body=self.RENTALS)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context['error_message'])
+                self.assertTrue(response.context['query_error'])
+                self.assertContains(response, 'Invalid listing options')
+                self.assertNotContains(response, 'Make sure the API server is running')
+
+    def test_rentals_fall_back_to_the_default_listing(self):
+        response = self.get('rentals', {'sort': 'rental_due_date'}, body=self.RENTALS)
+
+        self.assertEqual(response.context['total_rentals'], 2)
+        self.assertEqual(response.context['columns'], [field for field, _ in TABLE_COLUMNS['rentals']])
+
+    def test_api_errors_still_show_as_errors(self):
+        response = self.get('films', {'sort': 'title'}, status_code=500)
+
+        self.assertTrue(response.context['error_message'])
+        self.assertIsNone(response.context['query_error'])
+        self.assertContains(response, 'Make sure the API server is running')
+
+    def test_dataset_api_rejects_rental_fields_it_cannot_serve(self):
+        for params in ({'sort': '-rental_due_date'}, {'filter': 'overdue:true'}):
+            response = self.get('rentals_api', params, body=self.RENTALS)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
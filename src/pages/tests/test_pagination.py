@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import views
+from ..cache import DatasetCache
+from ..utils import decode_cursor, encode_cursor
+from .support import make_service
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(50, 123456789)), {'offset': 50, 'version': 123456789})
+
+    def test_rejects_garbage_and_negative_offsets(self):
+        self.assertIsNone(decode_cursor('not a cursor'))
+        self.assertIsNone(decode_cursor(''))
+        self.assertIsNone(decode_cursor(encode_cursor(-1, 1)))
+
+    def test_revision_follows_content_not_version(self):
+        datasets = DatasetCache(60)
+        first = datasets.put('films', [{'title': 'Alien'}])
+        same = datasets.put('films', [{'title': 'Alien'}])
+        changed = datasets.put('films', [{'title': 'Aliens'}])
+
+        self.assertNotEqual(first.version, same.version)
+        self.assertEqual(first.revision, same.revision)
+        self.assertNotEqual(first.revision, changed.revision)
+
+
+class DatasetApiTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self)
+        self.films = [{'title': f'Film {number}', 'rating': 'PG'} for number in range(25)]
+        patcher = mock.patch.object(views, 'api_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, params):
+        with mock.patch.object(self.service, '_fetch_list', return_value=(self.films, None)):
+            return self.client.get('/api/films/', params)
+
+    def test_walks_pages_with_the_cursor(self):
+        titles = []
+        params = {'limit': 10}
+        while True:
+            page = self.get(params).json()
+            titles.extend(film['title'] for film in page['results'])
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+
+        self.assertEqual(titles, [film['title'] for film in self.films])
+
+    def test_sparse_fields(self):
+        page = self.get({'limit': 2, 'fields': 'title'}).json()
+
+        self.assertEqual(page['results'], [{'title': 'Film 0'}, {'title': 'Film 1'}])
+
+    def test_rows_format(self):
+        page = self.get({'limit': 2, 'format': 'rows'}).json()
+
+        self.assertEqual(page['html'].count('<tr'), 2)
+        self.assertEqual(page['total'], 25)
+
+    def test_cursor_from_an_older_list_is_rejected(self):
+        cursor = self.get({'limit': 10}).json()['next_cursor']
+        self.service.invalidate_dataset('films')
+        self.films = self.films[1:]
+
+        response = self.get({'limit': 10, 'cursor': cursor})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('error', response.json())
+
+    def test_cursor_survives_a_refetch_of_the_same_list(self):
+        cursor = self.get({'limit': 10}).json()['next_cursor']
+        self.service.invalidate_dataset('films')
+
+        response = self.get({'limit': 10, 'cursor': cursor})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['title'], 'Film 10')
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get({'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.get({'limit': 'ten'}).status_code, 400)
+        self.assertEqual(self.get({'fields': 'nope'}).status_code, 400)
+
+    def test_upstream_failure_without_a_copy(self):
+        with mock.patch.object(self.service, '_fetch_list', return_value=(None, 'API returned status code: 500')):
+            response = self.client.get('/api/films/')
+
+        self.assertEqual(response.status_code, 502)
@@ -0,0 +1,164 @@
+import cProfile
+import io
+import json
+import pstats
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import middleware
+from ..middleware import SamplingProfilerMiddleware
+from ..profiling import PSTATS_SUFFIX, SAMPLES_SUFFIX, ProfileAggregator, StackSampler, safe_view_name
+
+
+def busy(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+class ProfileAggregatorTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = Path(directory.name)
+        self.aggregator = ProfileAggregator(self.output_dir, flush_interval=3600)
+
+    def profile(self):
+        profiler = cProfile.Profile()
+        profiler.runcall(busy, 0)
+        return profiler
+
+    def test_merges_deterministic_profiles_per_view(self):
+        self.aggregator.add_profile('films', self.profile())
+        self.aggregator.add_profile('films', self.profile())
+        self.aggregator.flush()
+
+        files = list((self.output_dir / 'films').glob(f'*{PSTATS_SUFFIX}'))
+        self.assertEqual(len(files), 1)
+        stats = pstats.Stats(str(files[0]))
+        calls = [ncalls for (_, _, name), (_, ncalls, *_) in stats.stats.items() if name == 'busy']
+        self.assertEqual(calls, [2])
+
+    def test_merges_samples_per_view(self):
+        for self_counts in ({'a': 2}, {'a': 1, 'b': 1}):
+            sampler = mock.Mock(samples=2, self_counts=self_counts, total_counts={'a': 2, 'b': 1})
+            self.aggregator.add_samples('customer_create', sampler)
+        self.aggregator.flush()
+
+        path, = (self.output_dir / 'customer_create').glob(f'*{SAMPLES_SUFFIX}')
+        self.assertEqual(json.loads(path.read_text()), {
+            'requests': 2, 'samples': 4, 'self': {'a': 3, 'b': 1}, 'total': {'a': 4, 'b': 2},
+        })
+
+    def test_flushes_on_the_interval(self):
+        aggregator = ProfileAggregator(self.output_dir, flush_interval=0)
+
+        aggregator.add_profile('films', self.profile())
+
+        self.assertTrue(list((self.output_dir / 'films').glob(f'*{PSTATS_SUFFIX}')))
+
+    def test_safe_view_name(self):
+        self.assertEqual(safe_view_name('admin:index'), 'admin_index')
+        self.assertEqual(safe_view_name(''), 'unnamed')
+
+
+class StackSamplerTests(SimpleTestCase):
+
+    def test_samples_the_running_function(self):
+        sampler = StackSampler(threading.get_ident(), interval=0.001)
+        sampler.start()
+        busy(0.05)
+        sampler.stop()
+
+        self.assertGreater(sampler.samples, 0)
+        self.assertTrue(any(label.endswith('(busy)') for label in sampler.self_counts))
+        self.assertTrue(any(label.endswith('(test_samples_the_running_function)') for label in sampler.total_counts))
+
+
+@override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_MODE='deterministic', PROFILER_URL_NAMES=[])
+class SamplingProfilerMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.aggregator = mock.Mock()
+        patcher = mock.patch.object(middleware, 'get_aggregator', return_value=self.aggregator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def call(self, path):
+        def view(request):
+            busy(0.02)
+            return HttpResponse('ok')
+
+        return SamplingProfilerMiddleware(view)(self.factory.get(path))
+
+    @override_settings(PROFILER_SAMPLE_RATE=0)
+    def test_off_removes_the_middleware(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            SamplingProfilerMiddleware(lambda request: HttpResponse())
+
+    @override_settings(PROFILER_MODE='tracing')
+    def test_rejects_unknown_modes(self):
+        with self.assertRaises(ValueError):
+            SamplingProfilerMiddleware(lambda request: HttpResponse())
+
+    def test_profiles_by_url_name(self):
+        self.assertEqual(self.call('/films/').content, b'ok')
+
+        view_name, profiler = self.aggregator.add_profile.call_args.args
+        self.assertEqual(view_name, 'films')
+        self.assertIsInstance(profiler, cProfile.Profile)
+
+    @override_settings(PROFILER_URL_NAMES=['rentals'])
+    def test_skips_views_not_listed(self):
+        self.call('/films/')
+        self.call('/no-such-page/')
+
+        self.aggregator.add_profile.assert_not_called()
+
+    @override_settings(PROFILER_MODE='statistical', PROFILER_SAMPLING_INTERVAL=0.001)
+    def test_statistical_mode(self):
+        self.call('/customers/')
+
+        view_name, sampler = self.aggregator.add_samples.call_args.args
+        self.assertEqual(view_name, 'customers')
+        self.assertGreater(sampler.samples, 0)
+
+    @override_settings(PROFILER_SAMPLE_RATE=0.5)
+    def test_samples_a_fraction_of_requests(self):
+        with mock.patch('random.random', side_effect=[0.7, 0.2]):
+            self.call('/films/')
+            self.call('/films/')
+
+        self.assertEqual(self.aggregator.add_profile.call_count, 1)
+
+
+class ProfileReportTests(SimpleTestCase):
+
+    def test_reports_every_profiled_view(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            aggregator = ProfileAggregator(Path(output_dir))
+            profiler = cProfile.Profile()
+            profiler.runcall(busy, 0)
+            aggregator.add_profile('films', profiler)
+            aggregator.add_samples('rentals', mock.Mock(samples=1, self_counts={'x.py:1(f)': 1},
+                                                        total_counts={'x.py:1(f)': 1}))
+            aggregator.flush()
+
+            out = io.StringIO()
+            with override_settings(PROFILER_OUTPUT_DIR=output_dir):
+                call_command('profile_report', stdout=out)
+
+        report = out.getvalue()
+        self.assertIn('=== films ===', report)
+        self.assertIn('busy', report)
+        self.assertIn('Statistical profile: 1 samples over 1 request(s)', report)
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..snapshots import SnapshotStore
+from .support import fake_response, make_service
+
+
+class SnapshotStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'snapshots.sqlite3')
+        self.store = SnapshotStore(self.path)
+
+    def other_worker(self, **kwargs) -> SnapshotStore:
+        store = SnapshotStore(self.path, **kwargs)
+        store.owner = 'other-worker'
+        return store
+
+    def test_write_and_read(self):
+        self.assertIsNone(self.store.read('films'))
+        self.assertIsNone(self.store.read_meta('films'))
+
+        self.assertTrue(self.store.write('films', [{'id': 1}], fetched_at=100))
+        self.assertTrue(self.store.write('films', [{'id': 2}], fetched_at=200))
+
+        items, meta = self.other_worker().read('films')
+        self.assertEqual(items, [{'id': 2}])
+        self.assertEqual((meta.version, meta.fetched_at, meta.invalidated), (2, 200, False))
+
+    def test_only_the_lease_holder_writes(self):
+        self.assertTrue(self.store.write('films', [{'id': 1}], fetched_at=100))
+
+        self.assertFalse(self.other_worker().write('films', [{'id': 2}], fetched_at=200))
+        self.assertEqual(self.store.read('films')[0], [{'id': 1}])
+
+    def test_expired_lease_is_taken_over(self):
+        SnapshotStore(self.path, lease_seconds=-1).write('films', [{'id': 1}], fetched_at=100)
+
+        self.assertTrue(self.other_worker().write('films', [{'id': 2}], fetched_at=200))
+
+    def test_invalidated_until_rewritten(self):
+        self.store.write('films', [{'id': 1}], fetched_at=100)
+
+        self.other_worker().mark_invalidated('films')
+        self.assertTrue(self.store.read_meta('films').invalidated)
+
+        self.store.write('films', [{'id': 1}], fetched_at=200)
+        self.assertFalse(self.store.read_meta('films').invalidated)
+
+    def test_changes_reported_before_an_update_are_ignored(self):
+        self.store.write('customers', [{'id': 1}], fetched_at=100, updated_at=300)
+
+        self.store.mark_invalidated('customers', changed_at=250)
+        self.assertFalse(self.store.read_meta('customers').invalidated)
+
+        self.store.mark_invalidated('customers', changed_at=350)
+        self.assertTrue(self.store.read_meta('customers').invalidated)
+
+    def test_unusable_file_reads_as_missing(self):
+        store = SnapshotStore(os.path.dirname(self.path))
+
+        self.assertIsNone(store.read_meta('films'))
+        self.assertIsNone(store.read('films'))
+        self.assertFalse(store.write('films', [], fetched_at=100))
+
+
+class SharedSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = make_service(self, FAILED_FETCH_BACKOFF=0)
+        self.sibling = make_service(self, FAILED_FETCH_BACKOFF=0, SNAPSHOT_PATH=self.service.config.SNAPSHOT_PATH)
+        self.sibling._snapshots.owner = 'sibling'
+
+    @staticmethod
+    def get_dataset(service, name, **response):
+        with mock.patch('requests.get', **response) as get:
+            dataset, error_message = service.get_dataset(name)
+        return dataset, error_message, get.call_count
+
+    def test_sibling_adopts_a_fresh_snapshot(self):
+        self.get_dataset(self.service, 'films', return_value=fake_response(200, [{'id': 1}]))
+
+        dataset, error_message, calls = self.get_dataset(self.sibling, 'films', return_value=fake_response(200, []))
+
+        self.assertEqual((dataset.items, error_message, calls), ([{'id': 1}], None, 0))
+
+    def test_invalidated_snapshot_is_refetched(self):
+        self.get_dataset(self.service, 'films', return_value=fake_response(200, [{'id': 1}]))
+        self.service.invalidate_dataset('films')
+
+        dataset, error_message, calls = self.get_dataset(self.sibling, 'films', return_value=fake_response(200, []))
+
+        self.assertEqual((dataset.items, calls), ([], 1))
+
+    def test_outage_serves_the_last_known_good_copy(self):
+        old = time.time() - 3600
+        self.service._snapshots.write('films', [{'id': 1}], fetched_at=old)
+        self.service._snapshots.mark_invalidated('films')
+
+        dataset, error_message, calls = self.get_dataset(self.sibling, 'films', return_value=fake_response(503))
+
+        self.assertIsNone(error_message)
+        self.assertEqual((dataset.items, dataset.fetched_at), ([{'id': 1}], old))
+        self.assertTrue(self.sibling.is_stale(dataset))
+
+    def test_outage_without_any_copy_is_an_error(self):
+        dataset, error_message, calls = self.get_dataset(self.service, 'films', return_value=fake_response(503))
+
+        self.assertIsNone(dataset)
+        self.assertTrue(error_message)
+
+    def test_patch_without_the_lease_flags_the_snapshot(self):
+        self.get_dataset(self.service, 'customers', return_value=fake_response(200, [{'id': 5, 'first_name': 'Old'}]))
+        self.get_dataset(self.sibling, 'customers', return_value=fake_response(200, []))
+
+        with mock.patch('requests.get', return_value=fake_response(200, {'id': 5, 'first_name': 'New'})):
+            self.sibling.apply_invalidations([{'type': 'customer', 'ids': [5]}])
+
+        self.assertEqual(self.sibling.peek_dataset('customers').items, [{'id': 5, 'first_name': 'New'}])
+        self.assertEqual(self.service._snapshots.read('customers')[0], [{'id': 5, 'first_name': 'Old'}])
+        self.assertTrue(self.service._snapshots.read_meta('customers').invalidated)
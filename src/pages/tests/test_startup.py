@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from .. import services
+
+# Boot a worker the way check_startup does and report what the boot pulled in
+BOOT_CHECK = """
+import sys
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+from pages import services
+print('requests' in sys.modules, services._api_service is not None)
+"""
+
+
+class ServiceSingletonTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(services, '_api_service', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_first_use_builds_one_service(self):
+        built = []
+
+        class SlowService:
+            def __init__(self):
+                time.sleep(0.05)
+                built.append(self)
+
+        results = []
+        with mock.patch.object(services, 'APIService', SlowService):
+            threads = [threading.Thread(target=lambda: results.append(services.get_api_service()))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(built), 1)
+        self.assertTrue(all(result is built[0] for result in results))
+
+
+class WorkerBootTests(SimpleTestCase):
+
+    def boot(self, profile):
+        result = subprocess.run(
+            [sys.executable, '-c', BOOT_CHECK], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={'DJANGO_SETTINGS_MODULE': profile, 'PATH': ''}, check=True
+        )
+        return result.stdout.split()
+
+    def test_boot_defers_requests_and_the_service(self):
+        for profile in ('config.settings', 'config.settings_lean'):
+            with self.subTest(profile=profile):
+                self.assertEqual(self.boot(profile), ['False', 'False'])
+
+    def test_check_startup_within_budget(self):
+        output = StringIO()
+        call_command('check_startup', runs=1, budget_ms=60000, stdout=output)
+
+        self.assertIn("within budget", output.getvalue())
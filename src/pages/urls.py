@@ -5,7 +5,15 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('films/', views.films, name='films'),
     path('customers/', views.customers, name='customers'),
+    path('customers/new/', views.customer_create, name='customer_create'),
     path('rentals/', views.rentals, name='rentals'),
+    path('rentals/checkout/', views.rental_checkout, name='rental_checkout'),
+    path('rentals/stream/', views.rentals_stream, name='rentals_stream'),
+    path('inventory/', views.inventory, name='inventory'),
     path('stores/', views.stores, name='stores'),
-    path('payments/', views.payments, name='payments')
+    path('payments/', views.payments, name='payments'),
+    path('api/films/', views.dataset_api, {'name': 'films'}, name='films_api'),
+    path('api/customers/', views.dataset_api, {'name': 'customers'}, name='customers_api'),
+    path('api/rentals/', views.dataset_api, {'name': 'rentals'}, name='rentals_api'),
+    path('internal/invalidate/', views.invalidate_webhook, name='invalidate_webhook'),
 ]
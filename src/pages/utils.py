@@ -1,8 +1,12 @@
 """
 Utility functions for the video rental portal application.
 """
+import base64
+import binascii
+import csv
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
@@ -101,6 +105,162 @@ def get_pagination_info(total_items: int, page: int = 1, per_page: int = 20) ->
     }
 
 
+def encode_cursor(offset: int, version: int) -> str:
+    """
+    Encode a pagination position as an opaque cursor.
+    
+    Args:
+        offset: Index of the next item to return
+        version: Revision of the dataset the offset refers to (Dataset.revision)
+        
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps({'o': offset, 'v': version}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[Dict[str, int]]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Args:
+        cursor: Cursor string from a previous page
+        
+    Returns:
+        Dictionary with 'offset' and 'version' (the dataset revision), or None if
+        the cursor is invalid
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset, version = int(data['o']), int(data['v'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+
+    if offset < 0:
+        return None
+
+    return {'offset': offset, 'version': version}
+
+
+def project_fields(items: Iterable[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Keep only the requested fields of each item (sparse fieldsets).
+    
+    Args:
+        items: Items to project
+        fields: Field names to keep, or None to keep every field
+        
+    Returns:
+        List of projected items
+    """
+    if not fields:
+        return list(items)
+
+    return [{field: item.get(field) for field in fields} for item in items]
+
+
+CUSTOMER_LINE_FIELDS = [
+    'first_name', 'last_name', 'email', 'store_id',
+    'address', 'district', 'city_name', 'postal_code', 'phone'
+]
+
+
+def parse_rental_lines(text: str, staff_id: int) -> Tuple[List[Dict[str, int]], List[str]]:
+    """
+    Parse bulk checkout input into CreateRentalRequest payloads.
+    
+    Each non-empty line is "inventory_id,customer_id" or
+    "inventory_id,customer_id,staff_id".
+    
+    Args:
+        text: Raw textarea input
+        staff_id: Staff ID used when a line doesn't give one
+        
+    Returns:
+        Tuple of (rentals, errors)
+    """
+    rentals = []
+    errors = []
+
+    for line_number, row in enumerate(csv.reader(text.splitlines()), start=1):
+        values = [value.strip() for value in row if value.strip()]
+        if not values:
+            continue
+
+        if len(values) not in (2, 3):
+            errors.append(f"Line {line_number}: expected inventory_id,customer_id[,staff_id]")
+            continue
+
+        try:
+            numbers = [int(value) for value in values]
+        except ValueError:
+            errors.append(f"Line {line_number}: IDs must be numbers")
+            continue
+
+        if any(number < 0 for number in numbers):
+            errors.append(f"Line {line_number}: IDs cannot be negative")
+            continue
+
+        rentals.append({
+            'inventory_id': numbers[0],
+            'customer_id': numbers[1],
+            'staff_id': numbers[2] if len(numbers) == 3 else staff_id,
+        })
+
+    return rentals, errors
+
+
+def parse_customer_lines(text: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Parse bulk customer input into CreateCustomerRequest payloads.
+    
+    Each non-empty line holds the fields in CUSTOMER_LINE_FIELDS order, comma separated.
+    
+    Args:
+        text: Raw textarea input
+        
+    Returns:
+        Tuple of (customers, errors)
+    """
+    customers = []
+    errors = []
+
+    for line_number, row in enumerate(csv.reader(text.splitlines()), start=1):
+        values = [value.strip() for value in row]
+        if not any(values):
+            continue
+
+        if len(values) != len(CUSTOMER_LINE_FIELDS):
+            errors.append(f"Line {line_number}: expected {len(CUSTOMER_LINE_FIELDS)} fields, got {len(values)}")
+            continue
+
+        fields = dict(zip(CUSTOMER_LINE_FIELDS, values))
+        try:
+            store_id = int(fields['store_id'])
+        except ValueError:
+            errors.append(f"Line {line_number}: store_id must be a number")
+            continue
+
+        customers.append({
+            'first_name': fields['first_name'],
+            'last_name': fields['last_name'],
+            'email': fields['email'],
+            'store_id': store_id,
+            'address': {
+                'address': fields['address'],
+                'address2': '',
+                'district': fields['district'],
+                'city_name': fields['city_name'],
+                'postal_code': fields['postal_code'],
+                'phone': fields['phone'],
+            },
+        })
+
+    return customers, errors
+
+
 def log_user_action(user_id: Optional[int], action: str, details: str = None):
     """
     Log user actions for audit purposes.
@@ -159,3 +319,61 @@ def is_debug_mode() -> bool:
         True if in debug mode, False otherwise
     """
     return getattr(settings, 'DEBUG', False)
+
+
+def parse_film_queries(text: str) -> List[Tuple[str, Any]]:
+    """
+    Parse availability checker input: one film ID or title per line.
+
+    Duplicates (same ID, or same title ignoring case) are dropped.
+
+    Returns:
+        List of ('id', film_id) or ('title', title) tuples, in input order
+    """
+    queries = []
+    seen = set()
+
+    for line in text.splitlines():
+        value = line.strip()
+        if not value:
+            continue
+
+        # isdecimal, not isdigit: superscripts like '²' are digits int() rejects
+        query = ('id', int(value)) if value.isdecimal() else ('title', value)
+        key = query if query[0] == 'id' else ('title', value.casefold())
+        if key not in seen:
+            seen.add(key)
+            queries.append(query)
+
+    return queries
+
+
+def summarize_inventory(copies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Count a film's inventory copies per store.
+
+    Copies are expected to carry store_id and inventory_id; a copy counts as
+    available unless it has a false "available" or "in_stock" flag.
+
+    Returns:
+        One dict per store, sorted by store_id, with keys store_id, available,
+        total and available_ids (the inventory IDs that can be checked out)
+    """
+    stores: Dict[Any, Dict[str, Any]] = {}
+
+    for copy in copies:
+        store = stores.setdefault(copy.get('store_id'), {
+            'store_id': copy.get('store_id'),
+            'available': 0,
+            'total': 0,
+            'available_ids': [],
+        })
+        store['total'] += 1
+
+        flag = copy.get('available', copy.get('in_stock', True))
+        if flag:
+            store['available'] += 1
+            if copy.get('inventory_id') is not None:
+                store['available_ids'].append(copy['inventory_id'])
+
+    return sorted(stores.values(), key=lambda store: (store['store_id'] is None, store['store_id'] or 0))
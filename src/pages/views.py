@@ -1,10 +1,108 @@
+import asyncio
+import json
 import logging
+import uuid
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from . import invalidation
+from .feeds import rentals_feed
+from .listing import ListQuery
+from .rows import build_rows, dataset_rows, render_rows
 from .services import api_service
-from .utils import log_user_action, format_error_message
+from .utils import (
+    log_user_action, format_error_message, encode_cursor, decode_cursor, project_fields,
+    parse_rental_lines, parse_customer_lines, CUSTOMER_LINE_FIELDS, parse_film_queries,
+    summarize_inventory
+)
 
 logger = logging.getLogger(__name__)
 
+# Seconds a client should wait before retrying after the request was shed
+BUSY_RETRY_AFTER = 5
+
+# Rows rendered with the page; the rest are appended as the user scrolls
+INITIAL_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Seconds between SSE keep-alive comments on an idle live feed
+FEED_KEEPALIVE = 15
+
+# Most items accepted in one bulk submission
+BULK_MAX_ITEMS = 200
+
+# Most films checked in one availability request
+INVENTORY_MAX_FILMS = 50
+
+
+def render_api_page(request, template_name, context):
+    """Render a page backed by the API, answering 503 when the request was shed."""
+    response = render(request, template_name, context)
+    if context.get('is_busy'):
+        response.status_code = 503
+        response['Retry-After'] = str(BUSY_RETRY_AFTER)
+    return response
+
+
+def list_query(request, name):
+    """
+    Parse the sort, filter and fields parameters of a listing page.
+
+    Returns:
+        Tuple of (query, error_message); an invalid query falls back to the default listing.
+        The message is about the URL, not the API, so pages show it as query_error.
+    """
+    query, error_message = ListQuery.from_params(name, request.GET)
+    return (query or ListQuery(name)), error_message
+
+
+def first_page(name, dataset, query):
+    """
+    Split the first page of display rows off a sorted and filtered dataset for server-side rendering.
+
+    Returns:
+        Tuple of (rows, total, next_cursor)
+    """
+    if dataset is None:
+        return [], 0, None
+
+    positions = query.positions(dataset)
+    all_rows = dataset_rows(name, dataset)
+    rows = [all_rows[position] for position in positions[:INITIAL_PAGE_SIZE]]
+    total = len(positions)
+    next_cursor = encode_cursor(INITIAL_PAGE_SIZE, dataset.revision) if total > INITIAL_PAGE_SIZE else None
+    return rows, total, next_cursor
+
+
+def listing_context(name, dataset, query):
+    """Context shared by the listing pages for the sort, filter and column controls."""
+    return {
+        'columns': [field for field, _ in query.columns()],
+        'list_controls': query.controls(dataset),
+        'list_query': query.query_string(),
+        'is_default_listing': query.is_default,
+    }
+
+
+def stale_since(dataset):
+    """When a last-known-good dataset was fetched, or None if the dataset is fresh."""
+    if dataset is None or not api_service.is_stale(dataset):
+        return None
+    return datetime.fromtimestamp(dataset.fetched_at, tz=timezone.utc)
+
+
+def json_error(error_message, status):
+    """JSON error response for the dataset endpoints."""
+    response = JsonResponse({'error': error_message}, status=status)
+    if status == 503:
+        response['Retry-After'] = str(BUSY_RETRY_AFTER)
+    return response
+
 
 def home(request):
     """Home page view."""
@@ -18,6 +116,11 @@ def films(request):
     
     films_data = []
     error_message = None
+    total_films = 0
+    next_cursor = None
+    dataset = None
+    query = ListQuery('films')
+    query_error = None
     search_film_id = request.GET.get('film_id')
     
     if search_film_id:
@@ -27,29 +130,40 @@ def films(request):
             film_data, error_message = api_service.get_film_by_id(film_id)
             
             if film_data and not error_message:
-                films_data = [film_data]  # Put single film in a list for template consistency
+                films_data = build_rows('films', [film_data])  # Single row, same template as the list
+                total_films = 1
                 log_user_action(None, f"Searched for film ID: {film_id}")
             elif not error_message:
                 error_message = f"No film found with ID: {film_id}"
         except ValueError:
             error_message = "Please enter a valid film ID number"
     else:
-        # Get all films
-        films_data, error_message = api_service.get_films()
+        # Get the first page of films; the rest load as the user scrolls
+        query, query_error = list_query(request, 'films')
+        dataset, error_message = api_service.get_dataset('films')
+        films_data, total_films, next_cursor = first_page('films', dataset, query)
     
+    is_busy = api_service.is_busy_error(error_message)
+
     # Format error message if needed
-    if error_message:
+    if error_message and not is_busy:
         error_message = format_error_message(error_message, "Films API")
     
     context = {
+        **listing_context('films', dataset, query),
         'films': films_data,
+        'rows_html': render_rows('films', films_data, request, query.columns()),
         'error_message': error_message,
-        'total_films': len(films_data),
+        'query_error': query_error,
+        'total_films': total_films,
+        'next_cursor': next_cursor,
+        'stale_since': stale_since(dataset),
         'search_film_id': search_film_id,
-        'is_search': bool(search_film_id)
+        'is_search': bool(search_film_id),
+        'is_busy': is_busy
     }
     
-    return render(request, 'pages/films.html', context)
+    return render_api_page(request, 'pages/films.html', context)
 
 
 def customers(request):
@@ -58,6 +172,11 @@ def customers(request):
     
     customers_data = []
     error_message = None
+    total_customers = 0
+    next_cursor = None
+    dataset = None
+    query = ListQuery('customers')
+    query_error = None
     search_customer_id = request.GET.get('customer_id')
     
     if search_customer_id:
@@ -67,45 +186,209 @@ def customers(request):
             customer_data, error_message = api_service.get_customer_by_id(customer_id)
             
             if customer_data and not error_message:
-                customers_data = [customer_data]  # Put single customer in a list for template consistency
+                customers_data = build_rows('customers', [customer_data])  # Single row, same template as the list
+                total_customers = 1
                 log_user_action(None, f"Searched for customer ID: {customer_id}")
             elif not error_message:
                 error_message = f"No customer found with ID: {customer_id}"
         except ValueError:
             error_message = "Please enter a valid customer ID number"
     else:
-        # Get all customers
-        customers_data, error_message = api_service.get_customers()
+        # Get the first page of customers; the rest load as the user scrolls
+        query, query_error = list_query(request, 'customers')
+        dataset, error_message = api_service.get_dataset('customers')
+        customers_data, total_customers, next_cursor = first_page('customers', dataset, query)
     
+    is_busy = api_service.is_busy_error(error_message)
+
     # Format error message if needed
-    if error_message:
+    if error_message and not is_busy:
         error_message = format_error_message(error_message, "Customers API")
     
     context = {
+        **listing_context('customers', dataset, query),
         'customers': customers_data,
+        'rows_html': render_rows('customers', customers_data, request, query.columns()),
         'error_message': error_message,
-        'total_customers': len(customers_data),
+        'query_error': query_error,
+        'total_customers': total_customers,
+        'next_cursor': next_cursor,
+        'stale_since': stale_since(dataset),
         'search_customer_id': search_customer_id,
-        'is_search': bool(search_customer_id)
+        'is_search': bool(search_customer_id),
+        'is_busy': is_busy
     }
 
-    return render(request, 'pages/customers.html', context)
+    return render_api_page(request, 'pages/customers.html', context)
 
 def rentals(request):
     """Rentals listing page"""
     log_user_action(None, "Accessed rentals page")
 
-    rentals_data = []
-    error_message = None
-    rentals_data, error_message = api_service.get_rentals()
+    query, query_error = list_query(request, 'rentals')
+    dataset, error_message = api_service.get_dataset('rentals')
+    rentals_data, total_rentals, next_cursor = first_page('rentals', dataset, query)
 
     context = {
+        **listing_context('rentals', dataset, query),
         'rentals': rentals_data,
+        'rows_html': render_rows('rentals', rentals_data, request, query.columns()),
         'error_message': error_message,
-        'total_rentals': len(rentals_data),
+        'query_error': query_error,
+        'total_rentals': total_rentals,
+        'next_cursor': next_cursor,
+        'stale_since': stale_since(dataset),
+        'is_busy': api_service.is_busy_error(error_message),
+    }
+
+    return render_api_page(request, 'pages/rentals.html', context)
+
+def bulk_submit_page(request, context, parse, submit):
+    """
+    Shared GET/POST handling for the bulk submission pages.
+
+    The form carries a batch key, so resubmitting the same lines reuses the same
+    idempotency keys and never creates anything twice.
+    """
+    context.update({
+        'batch_key': request.POST.get('batch_key') or uuid.uuid4().hex,
+        'lines': request.POST.get('lines', ''),
+        'errors': [],
+        'results': None,
+    })
+
+    if request.method == 'POST':
+        items, errors = parse(request)
+        if len(items) > BULK_MAX_ITEMS:
+            errors.append(f"At most {BULK_MAX_ITEMS} lines can be submitted at once")
+        elif not items and not errors:
+            errors.append("Enter at least one line")
+
+        context['errors'] = errors
+        if not errors:
+            results = submit(items, context['batch_key'])
+            context['results'] = results
+            context['succeeded'] = sum(1 for result in results if result['ok'])
+            context['failed'] = len(results) - context['succeeded']
+            context['is_busy'] = any(api_service.is_busy_error(result['error']) for result in results)
+
+    return render(request, 'pages/bulk_submit.html', context)
+
+
+def rental_checkout(request):
+    """Bulk rental checkout page."""
+    log_user_action(None, "Accessed rental checkout page")
+
+    try:
+        staff_id = int(request.POST.get('staff_id', 1))
+    except ValueError:
+        staff_id = 1
+
+    def parse(request):
+        rentals, errors = parse_rental_lines(request.POST.get('lines', ''), staff_id)
+        if staff_id < 1:
+            errors.append("Staff ID must be a positive number")
+        return rentals, errors
+
+    context = {
+        'heading': '🛒 Bulk Rental Checkout',
+        'description': 'Check out many rentals at once. One rental per line: inventory_id,customer_id[,staff_id]',
+        'placeholder': '367,130\n1525,459\n1711,408,2',
+        'staff_id': staff_id,
+        'show_staff_id': True,
+        'back_url_name': 'rentals',
     }
+    return bulk_submit_page(request, context, parse, api_service.bulk_create_rentals)
+
+
+def customer_create(request):
+    """Bulk customer creation page."""
+    log_user_action(None, "Accessed customer creation page")
+
+    context = {
+        'heading': '👤 Add Customers',
+        'description': 'Create one or more customers. One customer per line: ' + ','.join(CUSTOMER_LINE_FIELDS),
+        'placeholder': 'Mary,Smith,mary@example.com,1,47 MySakila Drive,Alberta,Lethbridge,35200,+14035550123',
+        'show_staff_id': False,
+        'back_url_name': 'customers',
+    }
+    return bulk_submit_page(
+        request, context,
+        lambda request: parse_customer_lines(request.POST.get('lines', '')),
+        api_service.bulk_create_customers
+    )
+
+
+async def rentals_stream(request):
+    """
+    Live rentals feed as Server-Sent Events.
+
+    Every connection shares the process-wide poller in feeds.rentals_feed, so open
+    tabs don't each reload /v1/rentals. Needs an ASGI server: under WSGI a stream
+    would tie up a worker thread forever, so it answers 503 and the page falls back
+    to manual refresh.
+    """
+    if not isinstance(request, ASGIRequest):
+        return json_error("The live rentals feed requires an ASGI server", 503)
+
+    queue = rentals_feed.subscribe()
+
+    async def events():
+        try:
+            yield f"retry: {BUSY_RETRY_AFTER * 1000}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=FEED_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break  # dropped for falling behind; the browser reconnects
+                yield message
+        finally:
+            rentals_feed.unsubscribe(queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def inventory(request):
+    """Availability per store for a list of film IDs or titles."""
+    log_user_action(None, "Accessed inventory page")
+
+    films_text = request.GET.get('films', '')
+    queries = parse_film_queries(films_text)
+    results = []
+    error_message = None
+
+    if len(queries) > INVENTORY_MAX_FILMS:
+        error_message = f"At most {INVENTORY_MAX_FILMS} films can be checked at once"
+    elif queries:
+        results = api_service.check_availability(queries)
+
+    for result in results:
+        result['stores'] = summarize_inventory(result['copies'])
+        result['available'] = sum(store['available'] for store in result['stores'])
+
+    # One column per store seen in any result
+    store_ids = sorted({store['store_id'] for result in results for store in result['stores']},
+                       key=lambda store_id: (store_id is None, store_id or 0))
+    for result in results:
+        by_store = {store['store_id']: store for store in result['stores']}
+        result['store_cells'] = [by_store.get(store_id) for store_id in store_ids]
+
+    context = {
+        'films_text': films_text,
+        'results': results,
+        'store_ids': store_ids,
+        'error_message': error_message,
+        'is_busy': any(api_service.is_busy_error(result['error']) for result in results),
+        'max_films': INVENTORY_MAX_FILMS,
+    }
+    return render_api_page(request, 'pages/inventory.html', context)
 
-    return render(request, 'pages/rentals.html', context)
 
 def stores(request):
     """stores listing page"""
@@ -118,3 +401,102 @@ def payments(request):
     log_user_action(None, "Accessed payments page")
 
     return render(request, 'pages/payments.html')
+
+
+@require_GET
+def dataset_api(request, name):
+    """
+    JSON listing of films, customers or rentals with cursor pagination.
+
+    Query parameters:
+        cursor: next_cursor from the previous page (omit for the first page)
+        limit: page size, up to MAX_PAGE_SIZE
+        fields: comma-separated sparse fieldset, e.g. "title,rating" (table columns with format=rows)
+        sort: field to sort by, "-field" for descending (see listing.SORT_FIELDS)
+        filter: "field:value", repeatable (see listing.FILTER_FIELDS)
+        format: "rows" to get rendered table rows instead of JSON items
+
+    A cursor from an older revision of the list gets a 409: its offset would
+    skip or repeat items, so the client has to start over.
+    """
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return json_error("limit must be a number", 400)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    offset = 0
+    position = None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return json_error("Invalid cursor", 400)
+        offset = position['offset']
+
+    query, error_message = ListQuery.from_params(name, request.GET)
+    if error_message:
+        return json_error(error_message, 400)
+
+    dataset, error_message = api_service.get_dataset(name)
+    if error_message:
+        status = 503 if api_service.is_busy_error(error_message) else 502
+        return json_error(error_message, status)
+
+    if position is not None and position['version'] != dataset.revision:
+        return json_error(f"The {name} list has changed since this page was loaded; reload to see it", 409)
+
+    positions = query.positions(dataset)
+    page_positions = positions[offset:offset + limit]
+    next_offset = offset + limit
+    next_cursor = encode_cursor(next_offset, dataset.revision) if next_offset < len(positions) else None
+
+    if request.GET.get('format') == 'rows':
+        all_rows = dataset_rows(name, dataset)
+        rows = [all_rows[position] for position in page_positions]
+        html = render_rows(name, rows, request, query.columns())
+        return JsonResponse({'html': html, 'next_cursor': next_cursor, 'total': len(positions)})
+
+    page_items = [dataset.items[position] for position in page_positions]
+    return JsonResponse({
+        'results': project_fields(page_items, query.fields),
+        'next_cursor': next_cursor,
+        'total': len(positions),
+        'version': dataset.version,
+        'stale': api_service.is_stale(dataset),
+        'fetched_at': datetime.fromtimestamp(dataset.fetched_at, tz=timezone.utc).isoformat(),
+    })
+
+
+@csrf_exempt
+@require_POST
+def invalidate_webhook(request):
+    """
+    Cache invalidation webhook for backend change events.
+
+    The body is {"events": [{"type": "film|customer|rental", "ids": [...]}]}, signed
+    with API_INVALIDATION_SECRET in the X-Timestamp and X-Signature headers (see
+    invalidation.sign_payload). Events are published to every worker on the host.
+    """
+    secret = getattr(settings, 'API_INVALIDATION_SECRET', '')
+    if not invalidation.verify_signature(
+            request.body,
+            request.headers.get('X-Timestamp'),
+            request.headers.get('X-Signature'),
+            secret):
+        logger.warning("Rejected cache invalidation request with a bad or missing signature")
+        return json_error("Invalid signature", 403)
+
+    try:
+        events = invalidation.parse_events(json.loads(request.body))
+    except ValueError:
+        events = None
+    if events is None:
+        return json_error("Expected {\"events\": [{\"type\": ..., \"ids\": [...]}]}", 400)
+
+    # Catch up first so this worker's feed has a baseline, then publish and apply
+    api_service.sync_invalidations(force=True)
+    sequence = invalidation.publish(events)
+    api_service.sync_invalidations(force=True)
+
+    return JsonResponse({'accepted': len(events), 'sequence': sequence}, status=202)
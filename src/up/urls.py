@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+app_name = 'up'
+urlpatterns = [
+    path('health/', views.health_check, name='health'),
+]
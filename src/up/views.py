@@ -9,10 +9,14 @@ from pages.services import api_service
 logger = logging.getLogger(__name__)
 
 
-def health_check():
+def health_check(request):
     """
     Health check endpoint that verifies API connectivity.
     Returns JSON response indicating system status.
+
+    Each call probes every API replica, ejecting failed ones and restoring
+    recovered ones, and reports the concurrency limiters' queue and shed
+    metrics and the rolling latency percentiles.
     """
     is_healthy, error_message = api_service.health_check()
 
@@ -21,8 +25,13 @@ def health_check():
     response_data = {
         'status': 'ok' if is_healthy else 'error',
         'api_connection': 'connected' if is_healthy else 'disconnected',
-        'api_url': api_service.config.BASE_URL,
-        'message': 'All systems operational' if is_healthy else error_message
+        # api_url predates the replica pool; it reports the first replica
+        'api_url': api_service.backends.urls[0],
+        'api_urls': api_service.backends.urls,
+        'backends': api_service.backends.stats(),
+        'message': 'All systems operational' if is_healthy else error_message,
+        'concurrency': api_service.get_concurrency_stats(),
+        'latency': api_service.get_latency_stats()
     }
 
     logger.info("Health check performed - Status: %s", response_data['status'])
@@ -40,7 +49,8 @@ def health_page(request):
     context = {
         'is_healthy': is_healthy,
         'error_message': error_message,
-        'api_url': api_service.config.BASE_URL,
+        'api_url': api_service.backends.urls[0],
+        'api_urls': api_service.backends.urls,
         'status_text': 'Operational' if is_healthy else 'Error'
     }
 